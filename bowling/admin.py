@@ -1,10 +1,38 @@
 from django.contrib import admin
-from bowling.models import Player, Frame, Chance, Game, PlayerGame, GamePlayer
+from bowling.models import Player, Frame, Chance, Game, PlayerGame, GamePlayer, PlayerStats, ScoreRollup
+
+
+class GameRowAdmin(admin.ModelAdmin):
+    """GameRowAdmin saves the Game a row belongs to after the row is edited or deleted.
+
+    Saving the Game bumps its version, which invalidates every cached state
+    and response for it in every process.
+    """
+
+    def get_game(self, obj):
+        return obj.game
+
+    def save_model(self, request, obj, form, change):
+        super(GameRowAdmin, self).save_model(request, obj, form, change)
+        self.get_game(obj).save()
+
+    def delete_model(self, request, obj):
+        game = self.get_game(obj)
+        super(GameRowAdmin, self).delete_model(request, obj)
+        game.save()
+
+
+class PlayerGameAdmin(GameRowAdmin):
+
+    def get_game(self, obj):
+        return obj.player.game
 
 
 admin.site.register(Player)
 admin.site.register(Frame)
 admin.site.register(Chance)
 admin.site.register(Game)
-admin.site.register(PlayerGame)
-admin.site.register(GamePlayer)
+admin.site.register(PlayerGame, PlayerGameAdmin)
+admin.site.register(GamePlayer, GameRowAdmin)
+admin.site.register(PlayerStats)
+admin.site.register(ScoreRollup)
@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.contrib.auth.models import User, Group
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from tastypie.authentication import ApiKeyAuthentication
+from tastypie.models import ApiKey
+import copy
+import threading
+import time
+
+
+class CredentialCache(object):
+    """CredentialCache is a process-wide map of (username, api key) to an authenticated User.
+
+    Users are stored with their permissions already loaded, so neither
+    authentication nor DjangoAuthorization queries the database on a hit.
+    Entries expire after BOWLING_AUTH_CACHE_TTL seconds and are dropped when
+    the User, its ApiKey, its groups or any permissions change.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'BOWLING_AUTH_CACHE_TTL', 60)
+
+    def get(self, username, api_key):
+        """Takes str username and api_key and returns a copy of the cached User, or None.
+
+        """
+        with self.lock:
+            entry = self.users.get((username, api_key))
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self.users[(username, api_key)]
+                return None
+        return copy.copy(entry[1])
+
+    def store(self, username, api_key, user):
+        """Takes str username, api_key and authenticated User and caches the User with its permissions.
+
+        """
+        user.get_all_permissions()
+        with self.lock:
+            self.users[(username, api_key)] = (time.monotonic(), user)
+
+    def discard(self, username):
+        """Takes str username and drops every entry for it.
+
+        """
+        with self.lock:
+            for key in [key for key in self.users if key[0] == username]:
+                del self.users[key]
+
+    def clear(self):
+        """Drops every entry.
+
+        """
+        with self.lock:
+            self.users = {}
+
+
+CREDENTIALS = CredentialCache()
+
+
+class CachedApiKeyAuthentication(ApiKeyAuthentication):
+    """CachedApiKeyAuthentication is Tastypie's ApiKeyAuthentication with successful checks kept in CREDENTIALS.
+
+    """
+
+    def is_authenticated(self, request, **kwargs):
+        try:
+            username, api_key = self.extract_credentials(request)
+        except ValueError:
+            return self._unauthorized()
+        if not username or not api_key:
+            return self._unauthorized()
+        user = CREDENTIALS.get(username, api_key)
+        if user is not None:
+            request.user = user
+            return True
+        result = super(CachedApiKeyAuthentication, self).is_authenticated(request, **kwargs)
+        if result is True:
+            CREDENTIALS.store(username, api_key, request.user)
+        return result
+
+
+@receiver([post_save, post_delete], sender=User)
+def discard_user_credentials(sender, instance, **kwargs):
+    """Drops cached credentials of a User when it changes.
+
+    """
+    CREDENTIALS.discard(instance.get_username())
+
+
+@receiver([post_save, post_delete], sender=ApiKey)
+def discard_api_key_credentials(sender, instance, **kwargs):
+    """Drops cached credentials of a User when its ApiKey changes.
+
+    """
+    CREDENTIALS.discard(instance.user.get_username())
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def clear_credentials(sender, **kwargs):
+    """Drops every cached credential when group membership or permissions change.
+
+    """
+    CREDENTIALS.clear()
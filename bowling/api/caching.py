@@ -0,0 +1,220 @@
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from bowling.models import Game, GamePlayer, PlayerGame
+from tastypie.cache import NoCache
+import hashlib
+import threading
+
+
+# Finished Games rarely change, but their responses embed Players and Users
+# that can; clients revalidate with the ETag after this many seconds.
+FINISHED_MAX_AGE = 60
+
+
+class ResponseCache(object):
+    """ResponseCache is a process-wide LRU of rendered responses for finished Games.
+
+    Entries are keyed by game pk and request and stored with the Game version
+    and roster stamp they were rendered from (see Game.roster_stamp),
+    so a lookup with any other version misses, whichever process made the
+    change. The
+    cache is bounded by the total size of the stored content, set with
+    BOWLING_FINISHED_CACHE_BYTES; the least recently used entries are evicted
+    first.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    @property
+    def max_bytes(self):
+        return getattr(settings, 'BOWLING_FINISHED_CACHE_BYTES', 32 * 1024 * 1024)
+
+    @staticmethod
+    def params(request):
+        """Takes request and returns its query parameters as a sorted tuple.
+
+        """
+        return tuple(sorted(
+            (param, tuple(values)) for param, values in request.GET.lists()
+        ))
+
+    @staticmethod
+    def key(pk, name, request, response_format):
+        """Takes game pk, str name of the route, request and str format and returns the entry key.
+
+        """
+        return (int(pk), name, response_format, ResponseCache.params(request))
+
+    def get(self, key, version):
+        """Takes key and version tuple (int version, str stamp) and returns the stored entry dict, or None.
+
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry['version'] != version:
+                self.remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def store(self, key, version, response):
+        """Takes key, version tuple (int version, str stamp) and rendered response and stores its content, evicting as needed.
+
+        """
+        content = response.content
+        if len(content) > self.max_bytes:
+            return
+        with self.lock:
+            self.remove(key)
+            self.entries[key] = {
+                'version': version,
+                'content': content,
+                'content_type': response['Content-Type'],
+                'etag': response.get('ETag')
+            }
+            self.size += len(content)
+            self.games.setdefault(key[0], set()).add(key)
+            while self.size > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        """Takes key and drops its entry; the lock must be held.
+
+        """
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry['content'])
+            keys = self.games[key[0]]
+            keys.discard(key)
+            if not keys:
+                del self.games[key[0]]
+
+    def discard(self, pk):
+        """Takes game pk and drops every entry for that Game.
+
+        """
+        with self.lock:
+            for key in list(self.games.get(pk, [])):
+                self.remove(key)
+
+    def clear(self):
+        """Drops every entry.
+
+        """
+        with self.lock:
+            self.entries = OrderedDict()
+            self.games = {}
+            self.size = 0
+
+    @staticmethod
+    def response(request, entry):
+        """Takes request and stored entry dict and returns a response for it, or 304 if the client has it.
+
+        """
+        not_modified = get_conditional_response(request, etag=entry['etag'])
+        if not_modified is not None:
+            return vary_on_accept(not_modified)
+        response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        if entry['etag']:
+            response['ETag'] = entry['etag']
+        return vary_on_accept(ResponseCache.mark_finished(response))
+
+    @staticmethod
+    def mark_finished(response):
+        """Takes response for a finished Game and returns it with a short private Cache-Control.
+
+        """
+        patch_cache_control(response, private=True, max_age=FINISHED_MAX_AGE)
+        return response
+
+
+FINISHED_GAMES = ResponseCache()
+
+
+def representation_tag(request, response_format, stamp=''):
+    """Takes request, str format and optional str roster stamp and returns str telling apart the representations of one game state, for its ETag.
+
+    The format (from ?format= or Accept) and the query parameters (fields=,
+    depth=, ...) all change the body, so each combination is tagged apart.
+    """
+    return hashlib.md5(
+        repr((response_format, ResponseCache.params(request), stamp)).encode('utf-8')
+    ).hexdigest()[:12]
+
+
+def vary_on_accept(response):
+    """Takes response and returns it with Vary: Accept, as its format may come from that header.
+
+    """
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+class FinishedGameCache(NoCache):
+    """FinishedGameCache is Tastypie's NoCache, except it leaves finished-game Cache-Control alone.
+
+    """
+
+    def cacheable(self, request, response):
+        if 'max-age' in response.get('Cache-Control', ''):
+            return False
+        return super(FinishedGameCache, self).cacheable(request, response)
+
+
+@receiver([post_save, post_delete], sender=Game)
+def discard_finished_game(sender, instance, **kwargs):
+    """Drops a Game's stored responses when it is edited or deleted.
+
+    """
+    FINISHED_GAMES.discard(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=GamePlayer)
+def discard_finished_gameplayer(sender, instance, **kwargs):
+    """Drops a Game's stored responses when one of its GamePlayers changes.
+
+    """
+    FINISHED_GAMES.discard(instance.game_id)
+
+
+@receiver([post_save, post_delete], sender=PlayerGame)
+def discard_finished_playergame(sender, instance, **kwargs):
+    """Drops a Game's stored responses when one of its rolls changes.
+
+    """
+    if instance.player_id is not None:
+        FINISHED_GAMES.discard(instance.player.game_id)
+
+
+def finished_game_response(request, pk, header, key, render, response_format):
+    """Takes request, game pk, header tuple from Game.get_version_status, entry key, render() and str format and returns the response.
+
+    Answers If-None-Match with 304 and tags the response with the game's state
+    ETag, which covers the roster stamp and the representation. A finished
+    game's response is rendered once, stored under key and served from
+    FINISHED_GAMES with a short private Cache-Control after that.
+    """
+    version, status, stamp = header
+    etag = Game.state_etag(pk, version, representation_tag(request, response_format, stamp))
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return vary_on_accept(not_modified)
+    if status == -1:
+        entry = FINISHED_GAMES.get(key, (version, stamp))
+        if entry is not None:
+            return FINISHED_GAMES.response(request, entry)
+    response = render()
+    if response.status_code == 200:
+        response['ETag'] = etag
+        vary_on_accept(response)
+        if status == -1:
+            FINISHED_GAMES.store(key, (version, stamp), FINISHED_GAMES.mark_finished(response))
+    return response
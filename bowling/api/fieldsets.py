@@ -0,0 +1,151 @@
+from tastypie.resources import ModelResource
+
+
+# Deeper than any chain of related resources in this API, so larger depths
+# nest exactly like no limit.
+MAX_DEPTH = 8
+
+
+def requested_depth(request):
+    """Takes request and returns int depth of nested full resources asked for, or None for no limit.
+
+    ``?full=0`` is the same as ``?depth=0``.
+    """
+    params = getattr(request, 'GET', {})
+    if params.get('full') in ['0', 'false']:
+        return 0
+    try:
+        return max(0, int(params['depth']))
+    except (KeyError, ValueError):
+        return None
+
+
+def requested_fields(request):
+    """Takes request and returns set of top-level field names asked for with ``?fields=``, or None.
+
+    """
+    fields = getattr(request, 'GET', {}).get('fields')
+    if not fields:
+        return None
+    return set(fields.split(',')) | {'resource_uri'}
+
+
+def dehydrate_level(request):
+    """Takes request and returns int number of resources currently being dehydrated for it.
+
+    """
+    return getattr(request, 'bowling_dehydrate_level', 0)
+
+
+def within_depth(bundle):
+    """Takes bundle and returns bool representing whether a related resource should be nested in full.
+
+    Used as ``full_list``/``full_detail`` on related fields.
+    """
+    depth = requested_depth(bundle.request)
+    return depth is None or dehydrate_level(bundle.request) <= depth
+
+
+class FieldsetResource(ModelResource):
+    """FieldsetResource adds ``?fields=``, ``?depth=`` and ``?full=`` to a ModelResource.
+
+    ``fields`` limits the top-level fields returned (resource_uri is always
+    kept), ``depth`` limits how many levels of related resources are nested in
+    full (0 returns URIs only) and ``full=0`` is ``depth=0``. Related rows are
+    loaded with select_related/prefetch_related down to the requested depth.
+    """
+    _related_paths = {}
+
+    def related_paths(self, depth, wanted=None):
+        """Returns tuple (select_related paths, prefetch_related paths) for nested full resources.
+
+        Paths are cached per resource, depth and requested fields. Unknown
+        field names and depths beyond MAX_DEPTH are dropped from the key
+        first, so clients can't grow the cache with made-up values.
+        """
+        if depth is not None and depth > MAX_DEPTH:
+            depth = None
+        if wanted is not None:
+            wanted = frozenset(wanted) & frozenset(self.fields)
+        key = (type(self), depth, wanted)
+        if key not in FieldsetResource._related_paths:
+            select, prefetch = [], []
+            self.collect_related_paths(depth, wanted, '', False, select, prefetch)
+            FieldsetResource._related_paths[key] = (select, prefetch)
+        return FieldsetResource._related_paths[key]
+
+    def collect_related_paths(self, depth, wanted, prefix, many, select, prefetch):
+        """Appends the ORM paths of this resource's full related fields to select and prefetch.
+
+        """
+        if depth is not None and depth < 1:
+            return
+        for field_name, field_object in self.fields.items():
+            if not getattr(field_object, 'is_related', False) or not field_object.full:
+                continue
+            if wanted is not None and field_name not in wanted:
+                continue
+            if not isinstance(field_object.attribute, str):
+                continue
+            path = prefix + field_object.attribute.replace('.', '__')
+            field_many = many or field_object.is_m2m
+            if field_many:
+                prefetch.append(path)
+            else:
+                select.append(path)
+            related = field_object.to_class()
+            if isinstance(related, FieldsetResource):
+                related.collect_related_paths(
+                    None if depth is None else depth - 1,
+                    None,
+                    path + '__',
+                    field_many,
+                    select,
+                    prefetch
+                )
+
+    def get_object_list(self, request):
+        object_list = super(FieldsetResource, self).get_object_list(request)
+        select, prefetch = self.related_paths(
+            requested_depth(request),
+            requested_fields(request)
+        )
+        if select:
+            object_list = object_list.select_related(*select)
+        if prefetch:
+            object_list = object_list.prefetch_related(*prefetch)
+        return object_list
+
+    def full_dehydrate(self, bundle, for_list=False):
+        request = bundle.request
+        level = dehydrate_level(request)
+        wanted = requested_fields(request) if level == 0 else None
+        request.bowling_dehydrate_level = level + 1
+        try:
+            if wanted is None:
+                return super(FieldsetResource, self).full_dehydrate(bundle, for_list)
+            return self.sparse_dehydrate(bundle, wanted, for_list)
+        finally:
+            request.bowling_dehydrate_level = level
+
+    def sparse_dehydrate(self, bundle, wanted, for_list=False):
+        """ModelResource.full_dehydrate limited to the field names in wanted.
+
+        """
+        for field_name, field_object in self.fields.items():
+            if field_name not in wanted:
+                continue
+            field_use_in = field_object.use_in
+            if callable(field_use_in):
+                if not field_use_in(bundle):
+                    continue
+            elif field_use_in not in ['all', 'list' if for_list else 'detail']:
+                continue
+            if field_object.dehydrated_type == 'related':
+                field_object.api_name = self._meta.api_name
+                field_object.resource_name = self._meta.resource_name
+            bundle.data[field_name] = field_object.dehydrate(bundle, for_list=for_list)
+            method = getattr(self, "dehydrate_%s" % field_name, None)
+            if method:
+                bundle.data[field_name] = method(bundle)
+        return self.dehydrate(bundle)
@@ -0,0 +1,154 @@
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from tastypie.exceptions import BadRequest
+from tastypie.paginator import Paginator
+import base64
+import json
+
+
+class KeysetPaginator(Paginator):
+    """KeysetPaginator pages through objects by keys, (date_created, id) here, instead of offset.
+
+    Each page ends with an opaque ``next`` cursor naming the last row sent, and
+    the next page starts after it with an indexed range scan, so neither a
+    COUNT(*) nor an OFFSET scan is run and deep pages cost the same as the
+    first. Add ``estimate_total=1`` for ``estimated_total_count`` from the
+    planner's statistics. Requests with ``offset`` or an ordering other than
+    by keys are paged by Tastypie's Paginator.
+    """
+    keys = ['date_created', 'id']
+
+    @staticmethod
+    def encode_key(value):
+        """Takes the first key's value and returns it as JSON-serializable.
+
+        """
+        return value.isoformat()
+
+    @staticmethod
+    def decode_key(value):
+        """Takes the first key's value from a cursor and returns it, or None if it is invalid.
+
+        """
+        return parse_datetime(value)
+
+    def get_direction(self):
+        """Returns '' or '-' for ascending or descending keyset order, or None if it can't be used.
+
+        """
+        order_by = list(getattr(getattr(self.objects, 'query', None), 'order_by', None) or [])
+        if not order_by:
+            return ''
+        for direction in ['', '-']:
+            if order_by in ([direction + key for key in self.keys], [direction + self.keys[0]]):
+                return direction
+        return None
+
+    @classmethod
+    def encode_cursor(cls, obj):
+        """Takes the last object of a page and returns str cursor for the page after it.
+
+        """
+        position = json.dumps([cls.encode_key(getattr(obj, cls.keys[0])), obj.id])
+        return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii')
+
+    @classmethod
+    def decode_cursor(cls, cursor):
+        """Takes str cursor and returns tuple (first key's value, int id).
+
+        """
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            value = cls.decode_key(value)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            value = None
+        if value is None:
+            raise BadRequest("Invalid cursor '%s' provided." % cursor)
+        return value, pk
+
+    def get_after(self, objects, direction, cursor):
+        """Returns objects filtered to those after the row named by cursor.
+
+        The bound on the first key alone lets the (key, id) index start the
+        scan at the cursor.
+        """
+        value, pk = self.decode_cursor(cursor)
+        lookup = 'lt' if direction else 'gt'
+        key = self.keys[0]
+        return objects.filter(
+            Q(**{key + '__' + lookup + 'e': value}),
+            Q(**{key + '__' + lookup: value}) | Q(**{'id__' + lookup: pk})
+        )
+
+    def get_estimated_count(self):
+        """Returns the planner's estimate of the number of objects, or None where it isn't available.
+
+        """
+        connection = connections[self.objects.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = self.objects.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def get_cursor_uri(self, limit, cursor):
+        if self.resource_uri is None:
+            return None
+        request_params = self.request_data.copy()
+        for param in ['limit', 'offset', 'cursor']:
+            if param in request_params:
+                del request_params[param]
+        request_params.update({'limit': limit, 'cursor': cursor})
+        return '%s?%s' % (
+            self.resource_uri,
+            request_params.urlencode()
+        )
+
+    def page(self):
+        direction = self.get_direction()
+        if 'offset' in self.request_data or direction is None:
+            return super(KeysetPaginator, self).page()
+        limit = self.get_limit()
+        objects = self.objects.order_by(*[direction + key for key in self.keys])
+        cursor = self.request_data.get('cursor')
+        if cursor:
+            objects = self.get_after(objects, direction, cursor)
+        if limit:
+            objects = list(objects[:limit + 1])
+        else:
+            objects = list(objects)
+        meta = {
+            'limit': limit,
+            'next': None,
+            'previous': None
+        }
+        if limit and len(objects) > limit:
+            objects = objects[:limit]
+            meta['next'] = self.get_cursor_uri(limit, self.encode_cursor(objects[-1]))
+        if self.request_data.get('estimate_total') in ['1', 'true']:
+            meta['estimated_total_count'] = self.get_estimated_count()
+        return {
+            self.collection_name: objects,
+            'meta': meta,
+        }
+
+
+class ScorePaginator(KeysetPaginator):
+    """ScorePaginator pages through GamePlayers by (final_score, id), highest first.
+
+    """
+    keys = ['final_score', 'id']
+
+    @staticmethod
+    def encode_key(value):
+        return value
+
+    @staticmethod
+    def decode_key(value):
+        return int(value)
@@ -1,27 +1,64 @@
 from tastypie.resources import ModelResource, ALL_WITH_RELATIONS, ALL, Resource
-from tastypie.authentication import ApiKeyAuthentication, MultiAuthentication, SessionAuthentication, BasicAuthentication
+from tastypie.authentication import MultiAuthentication, SessionAuthentication, BasicAuthentication
+from bowling.api.authentication import CachedApiKeyAuthentication
 from tastypie.authorization import Authorization, DjangoAuthorization
 from tastypie import fields
-from bowling.models import Player, Frame, Chance, Game, PlayerGame, GamePlayer
+from bowling.models import Player, Frame, Chance, Game, PlayerGame, GamePlayer, PlayerStats, ScoreRollup, GAME_CONTENTION, GAME_STATES, GameStateCache
 from django.contrib.auth.models import User
 from bowling.managers import GameManager
 from django.conf.urls import url
+from django.db.models import OuterRef, Subquery
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from tastypie.utils import trailing_slash
 from tastypie.bundle import Bundle
+from tastypie.exceptions import ImmediateHttpResponse
+from tastypie import http
+from bowling.api.fieldsets import FieldsetResource, within_depth
+from bowling.api.paginators import KeysetPaginator, ScorePaginator
+from bowling.export import export_lines, parse_filters
+from bowling.imports import import_players, import_request_rows, read_rows
+from bowling.api.caching import FINISHED_GAMES, FinishedGameCache, finished_game_response
+from itertools import islice
+import codecs
 import json
 
 
 ALL_METHODS = ['get', 'post', 'put', 'delete', 'patch']
+GAME_FILTERS = ['player__game', 'player__game__exact', 'player__game__id', 'player__game__id__exact']
 
 
-class UserResource(ModelResource):
+def whole_list_authorized(request, resource, check):
+    """ Return whether check (e.g. resource.authorized_read_list) allows every object, for responses built without the list
+
+    DjangoAuthorization answers a missing permission with an empty list
+    rather than Unauthorized.
+    """
+    allowed = check(resource.get_object_list(request), resource.build_bundle(request=request))
+    if hasattr(allowed, 'query'):
+        return not allowed.query.is_empty()
+    return bool(allowed)
+
+
+def json_field(request, name):
+    """ Return field name of a JSON object request body, answering 400 if the body is not one or lacks it """
+    try:
+        return json.loads(request.body.decode('utf-8'))[name]
+    except (ValueError, UnicodeDecodeError, TypeError, KeyError):
+        raise ImmediateHttpResponse(
+            response=http.HttpBadRequest("Body must be a JSON object with '{}'.".format(name))
+        )
+
+
+class UserResource(FieldsetResource):
     class Meta:
         queryset = User.objects.all()
         allowed_methods = ALL_METHODS
         resource_name = 'user'
         authorization = DjangoAuthorization()
         authentication = MultiAuthentication(
-            ApiKeyAuthentication(),
+            CachedApiKeyAuthentication(),
             SessionAuthentication()
         )
 
@@ -32,7 +69,7 @@ class GameManagerResource(Resource):
         resource_name = 'gamemanager'
         authorization = DjangoAuthorization()
         authentication = MultiAuthentication(
-            ApiKeyAuthentication(),
+            CachedApiKeyAuthentication(),
             SessionAuthentication(),
             BasicAuthentication()
         )
@@ -49,6 +86,9 @@ class GameManagerResource(Resource):
             url(r"^(?P<resource_name>%s)/new_game%s$" %
                 (self._meta.resource_name, trailing_slash()),
                 self.wrap_view('new_game'), name="new_game"),
+            url(r"^(?P<resource_name>%s)/new_games%s$" %
+                (self._meta.resource_name, trailing_slash()),
+                self.wrap_view('new_games'), name="new_games"),
         ]
 
     def get_game_resource_uri(self, bundle_or_obj):
@@ -76,16 +116,40 @@ class GameManagerResource(Resource):
             {'New Game': self.get_game_resource_uri(game)}
         )
 
+    def new_games(self, request, **kwargs):
+        self.method_check(request, allowed=['get', 'post'])
+        self.is_authenticated(request)
+        if request.method == 'GET':
+            rosters = [
+                roster.split(',') for roster in request.GET.getlist('games')
+            ]
+        else:
+            rosters = json_field(request, 'games')
+            if not isinstance(rosters, list) or not all(isinstance(roster, list) for roster in rosters):
+                raise ImmediateHttpResponse(
+                    response=http.HttpBadRequest("'games' must be a list of lists of player ids.")
+                )
+        try:
+            games = GameManager.new_games(rosters)
+        except (Player.DoesNotExist, ValueError, TypeError) as e:
+            raise ImmediateHttpResponse(
+                response=http.HttpBadRequest(str(e))
+            )
+        return self.create_response(
+            request,
+            {'New Games': [self.get_game_resource_uri(game) for game in games]}
+        )
 
-class PlayerResource(ModelResource):
-    user = fields.ToOneField(UserResource, 'user', full=True)
+
+class PlayerResource(FieldsetResource):
+    user = fields.ToOneField(UserResource, 'user', full=True, full_list=within_depth, full_detail=within_depth)
     class Meta:
         queryset = Player.objects.all()
         allowed_methods = ALL_METHODS
         resource_name = 'player'
         authorization = DjangoAuthorization()
         authentication = MultiAuthentication(
-            ApiKeyAuthentication(),
+            CachedApiKeyAuthentication(),
             SessionAuthentication(),
             BasicAuthentication()
         )
@@ -105,7 +169,13 @@ class PlayerResource(ModelResource):
         return [
             url(r"^(?P<resource_name>%s)/create%s$" %
                 (self._meta.resource_name, trailing_slash()),
-                self.wrap_view('create'), name="create")
+                self.wrap_view('create'), name="create"),
+            url(r"^(?P<resource_name>%s)/import%s$" %
+                (self._meta.resource_name, trailing_slash()),
+                self.wrap_view('import_players'), name="import_players"),
+            url(r"^(?P<resource_name>%s)/(?P<pk>\d+)/stats%s$" %
+                (self._meta.resource_name, trailing_slash()),
+                self.wrap_view('get_stats'), name="get_stats")
         ]
 
     def create(self, request, **kwargs):
@@ -125,15 +195,44 @@ class PlayerResource(ModelResource):
             {'New Player': self.get_resource_uri(new_user)}
         )
 
+    def import_players(self, request, **kwargs):
+        """ Create a player for each row of a CSV or JSON lines body, reporting the rows that failed """
+        self.method_check(request, allowed=['post'])
+        self.is_authenticated(request)
+        if not whole_list_authorized(request, self, self.authorized_create_list):
+            raise ImmediateHttpResponse(response=http.HttpUnauthorized())
+        format = 'csv' if request.content_type == 'text/csv' else 'json'
+        limit = import_request_rows()
+        rows = list(islice(read_rows(codecs.iterdecode(request, 'utf-8'), format), limit + 1))
+        if len(rows) > limit:
+            raise ImmediateHttpResponse(response=http.HttpBadRequest(
+                'At most {} rows can be imported per request; use the import_players command.'.format(limit)
+            ))
+        # Hashed in this process: a request shouldn't fork a pool of workers.
+        return self.create_response(request, import_players(rows, workers=1))
+
+    def get_stats(self, request, **kwargs):
+        """ Serve a player's career stats from PlayerStats with one primary key lookup """
+        self.method_check(request, allowed=['get'])
+        self.is_authenticated(request)
+        bundle = self.build_bundle(obj=Player(pk=kwargs['pk']), request=request)
+        self.authorized_read_detail(self.get_object_list(request), bundle)
+        stats = PlayerStats.objects.filter(pk=kwargs['pk']).first()
+        if stats is None:
+            if not Player.objects.filter(pk=kwargs['pk']).exists():
+                return http.HttpNotFound()
+            stats = PlayerStats(player_id=int(kwargs['pk']))
+        return self.create_response(request, stats.as_dict())
+
 
-class FrameResource(ModelResource):
+class FrameResource(FieldsetResource):
     class Meta:
         queryset = Frame.objects.all()
         allowed_methods = ALL_METHODS
         resource_name = 'frame'
         authorization = DjangoAuthorization()
         authentication = MultiAuthentication(
-            ApiKeyAuthentication(),
+            CachedApiKeyAuthentication(),
             SessionAuthentication()
         )
         ordering = {
@@ -148,14 +247,14 @@ class FrameResource(ModelResource):
         }
 
 
-class ChanceResource(ModelResource):
+class ChanceResource(FieldsetResource):
     class Meta:
         queryset = Chance.objects.all()
         allowed_methods = ALL_METHODS
         resource_name = 'chance'
         authorization = DjangoAuthorization()
         authentication = MultiAuthentication(
-            ApiKeyAuthentication(),
+            CachedApiKeyAuthentication(),
             SessionAuthentication()
         )
         ordering = {
@@ -170,15 +269,17 @@ class ChanceResource(ModelResource):
         }
 
 
-class GameResource(ModelResource):
-    players = fields.ToManyField(PlayerResource, 'players', null=True, full=True)
+class GameResource(FieldsetResource):
+    players = fields.ToManyField(PlayerResource, 'players', null=True, full=True, full_list=within_depth, full_detail=within_depth)
     class Meta:
         queryset = Game.objects.all()
         allowed_methods = ALL_METHODS
         resource_name = 'game'
+        paginator_class = KeysetPaginator
+        cache = FinishedGameCache()
         authorization = DjangoAuthorization()
         authentication = MultiAuthentication(
-            ApiKeyAuthentication(),
+            CachedApiKeyAuthentication(),
             SessionAuthentication(),
             BasicAuthentication()
         )
@@ -196,12 +297,21 @@ class GameResource(ModelResource):
     def prepend_urls(self):
         """ Add following array of urls to GameResource base urls """
         return [
+            url(r"^(?P<resource_name>%s)/contention%s$" %
+                (self._meta.resource_name, trailing_slash()),
+                self.wrap_view('contention'), name="contention"),
+            url(r"^(?P<resource_name>%s)/export%s$" %
+                (self._meta.resource_name, trailing_slash()),
+                self.wrap_view('export'), name="export"),
             url(r"^(?P<resource_name>%s)/(?P<pk>\w[\w/-]*)/start%s$" %
                 (self._meta.resource_name, trailing_slash()),
                 self.wrap_view('start'), name="start"),
             url(r"^(?P<resource_name>%s)/(?P<pk>\w[\w/-]*)/bowl%s$" %
                 (self._meta.resource_name, trailing_slash()),
                 self.wrap_view('bowl'), name="bowl"),
+            url(r"^(?P<resource_name>%s)/(?P<pk>\w[\w/-]*)/bowl_batch%s$" %
+                (self._meta.resource_name, trailing_slash()),
+                self.wrap_view('bowl_batch'), name="bowl_batch"),
             url(r"^(?P<resource_name>%s)/(?P<pk>\w[\w/-]*)/get_state%s$" %
                 (self._meta.resource_name, trailing_slash()),
                 self.wrap_view('get_state'), name="get_state"),
@@ -233,7 +343,43 @@ class GameResource(ModelResource):
             {"Bowl Entered": game.bowl(mark)}
         )
 
-    def get_state(self, request, **kwargs):
+    def contention(self, request, **kwargs):
+        self.method_check(request, allowed=['get'])
+        self.is_authenticated(request)
+        if not whole_list_authorized(request, self, self.authorized_read_list):
+            raise ImmediateHttpResponse(response=http.HttpUnauthorized())
+        return self.create_response(
+            request,
+            {"Contention": GAME_CONTENTION.as_dict()}
+        )
+
+    def export(self, request, **kwargs):
+        """ Stream the history of games as one JSON line per game, filtered by start, end and player """
+        self.method_check(request, allowed=['get'])
+        self.is_authenticated(request)
+        if not whole_list_authorized(request, self, self.authorized_read_list):
+            raise ImmediateHttpResponse(response=http.HttpUnauthorized())
+        try:
+            filters = parse_filters(request.GET)
+        except ValueError as e:
+            raise ImmediateHttpResponse(response=http.HttpBadRequest(str(e)))
+        return StreamingHttpResponse(
+            export_lines(**filters),
+            content_type='application/x-ndjson'
+        )
+
+    def bowl_batch(self, request, **kwargs):
+        self.method_check(request, allowed=['get', 'post'])
+        if request.method == 'GET':
+            marks = request.GET.get('marks', '').split(',')
+        elif request.content_type == 'application/json':
+            marks = json_field(request, 'marks')
+            if not isinstance(marks, list) or not all(isinstance(mark, str) for mark in marks):
+                raise ImmediateHttpResponse(
+                    response=http.HttpBadRequest("'marks' must be a list of marks.")
+                )
+        else:
+            marks = request.POST.get('marks', '').split(',')
         self.is_authenticated(request)
         basic_bundle = self.build_bundle(request=request)
         game = self.cached_obj_get(
@@ -241,20 +387,68 @@ class GameResource(ModelResource):
             **self.remove_api_resource_names(kwargs))
         return self.create_response(
             request,
-            {"State": game.get_state()}
+            {
+                "Bowls Entered": game.bowl_many([mark for mark in marks if mark]),
+                "State": game.get_state()
+            }
+        )
+
+    def get_state(self, request, **kwargs):
+        self.is_authenticated(request)
+        self.authorized_state_read(request, kwargs.get('pk'))
+        header = Game.get_version_status(kwargs.get('pk'))
+        if header is None:
+            raise ImmediateHttpResponse(response=http.HttpNotFound())
+        return finished_game_response(
+            request,
+            kwargs['pk'],
+            header,
+            FINISHED_GAMES.key(kwargs['pk'], 'get_state', request, self.determine_format(request)),
+            lambda: self.create_response(request, {"State": self.read_state(kwargs['pk'], header)}),
+            self.determine_format(request)
         )
 
+    def read_state(self, pk, header):
+        """ Return a game's state from GAME_STATES at the version in header, or from the database for a finished game whose response will be stored """
+        version, status, stamp = header
+        try:
+            if status == -1:
+                return GameStateCache.as_state(GAME_STATES.store(Game.get_with_roster(pk)))
+            return Game.get_cached_state(pk, version)[2]
+        except Game.DoesNotExist:
+            raise ImmediateHttpResponse(response=http.HttpNotFound())
+
+    def get_detail(self, request, **kwargs):
+        """ Answer If-None-Match with 304 from the game version and roster stamp and serve finished games from FINISHED_GAMES """
+        header = Game.get_version_status(kwargs.get('pk'))
+        if header is None:
+            return super(GameResource, self).get_detail(request, **kwargs)
+        self.authorized_state_read(request, kwargs['pk'])
+        return finished_game_response(
+            request,
+            kwargs['pk'],
+            header,
+            FINISHED_GAMES.key(kwargs['pk'], 'detail', request, self.determine_format(request)),
+            lambda: super(GameResource, self).get_detail(request, **kwargs),
+            self.determine_format(request)
+        )
+
+    def authorized_state_read(self, request, pk):
+        """ Check read permission on a game without loading it, for responses built without obj_get """
+        bundle = self.build_bundle(obj=Game(pk=pk), request=request)
+        self.authorized_read_detail(self.get_object_list(request), bundle)
 
-class GamePlayerResource(ModelResource):
-    player = fields.ForeignKey(PlayerResource, 'player', null=True, full=True)
-    game = fields.ForeignKey(GameResource, 'game', null=True, full=True)
+
+class GamePlayerResource(FieldsetResource):
+    player = fields.ForeignKey(PlayerResource, 'player', null=True, full=True, full_list=within_depth, full_detail=within_depth)
+    game = fields.ForeignKey(GameResource, 'game', null=True, full=True, full_list=within_depth, full_detail=within_depth)
     class Meta:
         queryset = GamePlayer.objects.all()
         allowed_methods = ALL_METHODS
         resource_name = 'gameplayer'
         authorization = DjangoAuthorization()
         authentication = MultiAuthentication(
-            ApiKeyAuthentication(),
+            CachedApiKeyAuthentication(),
             SessionAuthentication()
         )
         ordering = {
@@ -270,17 +464,112 @@ class GamePlayerResource(ModelResource):
         }
 
 
-class PlayerGameResource(ModelResource):
-    player = fields.ForeignKey(GamePlayerResource, 'player', null=True, full=True)
-    frame = fields.ForeignKey(FrameResource, 'frame', null=True, full=True)
-    chance = fields.ForeignKey(ChanceResource, 'chance', null=True, full=True)
+class LeaderboardResource(FieldsetResource):
+    """ Final scores of finished games, highest first, read from the final_score indexes
+
+    ?player=<id> limits the board to one player, ?date_finished__gte= and
+    ?date_finished__lt= to a date range and ?best=1 to each player's best game.
+    Pages follow the (final_score, id) cursor in meta.next.
+    """
+    player = fields.ForeignKey(PlayerResource, 'player')
+    player_name = fields.CharField(attribute='player__name', readonly=True)
+    game = fields.ForeignKey(GameResource, 'game')
+    class Meta:
+        queryset = GamePlayer.objects.filter(
+            final_score__isnull=False
+        ).select_related('player', 'game').order_by('-final_score', '-id')
+        fields = ['id', 'final_score', 'date_finished', 'player', 'player_name', 'game']
+        allowed_methods = ['get']
+        list_allowed_methods = ['get']
+        detail_allowed_methods = []
+        resource_name = 'leaderboard'
+        paginator_class = ScorePaginator
+        authorization = DjangoAuthorization()
+        authentication = MultiAuthentication(
+            CachedApiKeyAuthentication(),
+            SessionAuthentication(),
+            BasicAuthentication()
+        )
+        filtering = {
+            'player': ['exact'],
+            'date_finished': ['gte', 'gt', 'lte', 'lt']
+        }
+
+    def apply_filters(self, request, applicable_filters):
+        objects = super(LeaderboardResource, self).apply_filters(request, applicable_filters)
+        if request.GET.get('best') in ['1', 'true']:
+            best = GamePlayer.objects.filter(
+                final_score__isnull=False,
+                player=OuterRef('player'),
+                **applicable_filters
+            ).order_by('-final_score', '-id').values('id')[:1]
+            objects = objects.filter(id=Subquery(best))
+        return objects
+
+
+class ScoreRollupResource(FieldsetResource):
+    class Meta:
+        queryset = ScoreRollup.objects.all().order_by('start', 'period')
+        allowed_methods = ['get']
+        resource_name = 'rollup'
+        authorization = DjangoAuthorization()
+        authentication = MultiAuthentication(
+            CachedApiKeyAuthentication(),
+            SessionAuthentication(),
+            BasicAuthentication()
+        )
+        ordering = {
+            'start': ALL
+        }
+        filtering = {
+            'id': ALL,
+            'period': ['exact'],
+            'start': ALL
+        }
+
+    def prepend_urls(self):
+        """ Add following array of urls to ScoreRollupResource base urls """
+        return [
+            url(r"^(?P<resource_name>%s)/summary%s$" %
+                (self._meta.resource_name, trailing_slash()),
+                self.wrap_view('summary'), name="summary")
+        ]
+
+    def summary(self, request, **kwargs):
+        """ Combine the day and week rollups covering start through end (inclusive, default today) """
+        self.method_check(request, allowed=['get'])
+        self.is_authenticated(request)
+        if not whole_list_authorized(request, self, self.authorized_read_list):
+            raise ImmediateHttpResponse(response=http.HttpUnauthorized())
+        today = timezone.localdate()
+        dates = {}
+        for name in ['start', 'end']:
+            value = request.GET.get(name)
+            try:
+                dates[name] = parse_date(value) if value else today
+            except ValueError:
+                dates[name] = None
+            if dates[name] is None:
+                return http.HttpBadRequest("Invalid date '{}'.".format(value))
+        if dates['start'] > dates['end']:
+            return http.HttpBadRequest('start is after end.')
+        totals = ScoreRollup.summarize(dates['start'], dates['end']).totals_dict()
+        return self.create_response(request, dict(totals, **dates))
+
+
+class PlayerGameResource(FieldsetResource):
+    player = fields.ForeignKey(GamePlayerResource, 'player', null=True, full=True, full_list=within_depth, full_detail=within_depth)
+    frame = fields.ForeignKey(FrameResource, 'frame', null=True, full=True, full_list=within_depth, full_detail=within_depth)
+    chance = fields.ForeignKey(ChanceResource, 'chance', null=True, full=True, full_list=within_depth, full_detail=within_depth)
     class Meta:
         queryset = PlayerGame.objects.all()
         allowed_methods = ALL_METHODS
         resource_name = 'playergame'
+        paginator_class = KeysetPaginator
+        cache = FinishedGameCache()
         authorization = DjangoAuthorization()
         authentication = MultiAuthentication(
-            ApiKeyAuthentication(),
+            CachedApiKeyAuthentication(),
             SessionAuthentication()
         )
         ordering = {
@@ -297,3 +586,23 @@ class PlayerGameResource(ModelResource):
             'date_created': ALL,
             'date_updated': ALL
         }
+
+    def get_list(self, request, **kwargs):
+        """ Serve a finished game's rolls from FINISHED_GAMES when the list is filtered by game """
+        for param in GAME_FILTERS:
+            if param in request.GET:
+                pk = request.GET[param]
+                break
+        else:
+            return super(PlayerGameResource, self).get_list(request, **kwargs)
+        header = Game.get_version_status(pk)
+        if header is None or not whole_list_authorized(request, self, self.authorized_read_list):
+            return super(PlayerGameResource, self).get_list(request, **kwargs)
+        return finished_game_response(
+            request,
+            pk,
+            header,
+            FINISHED_GAMES.key(pk, 'playergame', request, self.determine_format(request)),
+            lambda: super(PlayerGameResource, self).get_list(request, **kwargs),
+            self.determine_format(request)
+        )
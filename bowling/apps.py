@@ -1,5 +1,31 @@
 from django.apps import AppConfig
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import post_migrate
+
+
+def load_reference_rows(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Loads the Frame/Chance maps once the database is migrated.
+
+    post_migrate is sent after every migrate, including ones that leave the
+    bowling tables missing (another app on a fresh database, bowling zero).
+    The maps are then left cleared and fill lazily on first use. They are
+    read from the default database, so migrating another one only clears
+    them.
+    """
+    from bowling.models import FRAMES, CHANCES, Frame, Chance
+    FRAMES.clear()
+    CHANCES.clear()
+    if using != DEFAULT_DB_ALIAS:
+        return
+    tables = connections[using].introspection.table_names()
+    if Frame._meta.db_table not in tables or Chance._meta.db_table not in tables:
+        return
+    FRAMES.get_rows()
+    CHANCES.get_rows()
 
 
 class BowlingConfig(AppConfig):
     name = 'bowling'
+
+    def ready(self):
+        post_migrate.connect(load_reference_rows, sender=self)
@@ -0,0 +1,249 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+from tastypie import http
+from bowling.events import EVENTS, format_event, version_gap
+from bowling.models import Game
+from bowling import views
+from io import BytesIO
+import asyncio
+import re
+
+
+LANE_PATH = re.compile(r'^/bowling/game/(?P<pk>\d+)/(?P<view>bowl|get_state|events)/$')
+LANE_VIEWS = {
+    'bowl': views.bowl,
+    'get_state': views.get_state
+}
+# ORM work for the async lane handlers runs here, so at most this many
+# database connections are used however many clients are connected.
+LANE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'BOWLING_ASGI_THREADS', 8),
+    thread_name_prefix='lane'
+)
+
+
+def build_environ(scope, body):
+    """Takes ASGI http scope and bytes body and returns WSGI environ dict for them.
+
+    """
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('ascii'),
+        'SERVER_NAME': scope.get('server', ('localhost', 80))[0],
+        'SERVER_PORT': str(scope.get('server', ('localhost', 80))[1]),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': BytesIO(),
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ['CONTENT_LENGTH', 'CONTENT_TYPE']:
+            name = 'HTTP_' + name
+        value = value.decode('latin1')
+        if name in environ:
+            value = environ[name] + ',' + value
+        environ[name] = value
+    return environ
+
+
+def lane_request(environ):
+    """Takes WSGI environ and returns a request with its session and user loaded, as the lane views expect.
+
+    """
+    request = WSGIRequest(environ)
+    SessionMiddleware().process_request(request)
+    AuthenticationMiddleware().process_request(request)
+    return request
+
+
+def in_lane_thread(function):
+    """Decorates function to run in a LANE_EXECUTOR thread with fresh database connections, as Django does per request.
+
+    """
+    def wrapped(*args):
+        close_old_connections()
+        try:
+            return function(*args)
+        finally:
+            close_old_connections()
+
+    async def run(*args):
+        return await asyncio.get_event_loop().run_in_executor(LANE_EXECUTOR, wrapped, *args)
+    return run
+
+
+@in_lane_thread
+def call_view(view, environ, pk):
+    """Takes lane view, WSGI environ and game pk and returns the view's response.
+
+    """
+    return view(lane_request(environ), pk)
+
+
+@in_lane_thread
+def open_events(environ, pk):
+    """Takes WSGI environ and game pk and returns tuple (error response or None, last event id or None).
+
+    """
+    request = lane_request(environ)
+    unauthorized = views.lane_unauthorized(request)
+    if unauthorized is not None:
+        return unauthorized, None
+    try:
+        Game.get_cached_state(pk)
+    except Game.DoesNotExist:
+        return views.lane_response({'error': 'Game not found.'}, http.HttpNotFound), None
+    return None, views.requested_event_id(request)
+
+
+@in_lane_thread
+def read_state(pk):
+    """Takes game pk and returns it as a state event.
+
+    """
+    return views.state_event(pk)
+
+
+class AsyncSubscriber(object):
+    """AsyncSubscriber hands events published on any thread to an asyncio.Queue.
+
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(loop=loop)
+
+    def put(self, event):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+
+class LaneApplication(object):
+    """LaneApplication is an ASGI application serving the lane routes natively and everything else with fallback.
+
+    bowl and get_state run the lane views in LANE_EXECUTOR. events streams
+    from EVENTS on the event loop, so an idle scoreboard holds no thread.
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def __call__(self, scope):
+        match = LANE_PATH.match(scope.get('path', '')) if scope['type'] == 'http' else None
+        if match is None:
+            return self.fallback(scope)
+        return LaneInstance(scope, int(match.group('pk')), match.group('view'))
+
+
+class LaneInstance(object):
+    """LaneInstance handles one lane request for LaneApplication.
+
+    """
+
+    def __init__(self, scope, pk, view):
+        self.scope = scope
+        self.pk = pk
+        self.view = view
+
+    async def __call__(self, receive, send):
+        body = b''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        environ = build_environ(self.scope, body)
+        if self.view == 'events':
+            await self.stream_events(environ, receive, send)
+        else:
+            await self.send_response(send, await call_view(LANE_VIEWS[self.view], environ, self.pk))
+
+    async def send_response(self, send, response, more_body=False):
+        headers = [
+            (name.lower().encode('latin1'), value.encode('latin1'))
+            for name, value in response.items()
+        ]
+        for cookie in response.cookies.values():
+            headers.append((b'set-cookie', cookie.output(header='').strip().encode('latin1')))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': b'' if more_body else response.content,
+            'more_body': more_body
+        })
+
+    async def stream_events(self, environ, receive, send):
+        """Sends the game's events as views.event_stream does, until it is over or the client leaves.
+
+        """
+        error, last_event_id = await open_events(environ, self.pk)
+        if error is not None:
+            await self.send_response(send, error)
+            return
+        heartbeat = getattr(settings, 'BOWLING_EVENTS_HEARTBEAT', 15)
+        subscriber, missed = EVENTS.subscribe(
+            self.pk,
+            last_event_id,
+            AsyncSubscriber(asyncio.get_event_loop())
+        )
+        disconnect = asyncio.ensure_future(receive())
+        try:
+            response = StreamingHttpResponse(content_type='text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            await self.send_response(send, response, more_body=True)
+            await self.send_chunk(send, 'retry: {}\n\n'.format(heartbeat * 1000))
+            if missed is None:
+                missed = [await read_state(self.pk)]
+            last_sent = last_event_id
+            while True:
+                for event in missed:
+                    if last_sent is not None and event[0] <= last_sent:
+                        continue
+                    if version_gap(event, last_sent):
+                        event = await read_state(self.pk)
+                    await self.send_chunk(send, format_event(event))
+                    last_sent = event[0]
+                    if event[2]['status'] == -1:
+                        await send({'type': 'http.response.body', 'body': b''})
+                        return
+                next_event = asyncio.ensure_future(subscriber.queue.get())
+                done, pending = await asyncio.wait(
+                    [next_event, disconnect],
+                    timeout=heartbeat,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if disconnect in done:
+                    next_event.cancel()
+                    return
+                if next_event in done:
+                    missed = [next_event.result()]
+                else:
+                    next_event.cancel()
+                    missed = []
+                    await self.send_chunk(send, ': heartbeat\n\n')
+        finally:
+            disconnect.cancel()
+            EVENTS.unsubscribe(self.pk, subscriber)
+
+    async def send_chunk(self, send, chunk):
+        await send({
+            'type': 'http.response.body',
+            'body': chunk.encode('utf-8'),
+            'more_body': True
+        })
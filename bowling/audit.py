@@ -0,0 +1,227 @@
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from bowling.models import Game, GamePlayer, PlayerGame, VALID_MARKS
+from multiprocessing import Pool
+import json
+import os
+
+
+AUDIT_CHUNK_SIZE = 500
+# Rows per UPDATE ... CASE, keeping the parameters under SQLite's limit.
+UPDATE_BATCH_SIZE = 100
+GAME_AUDIT_FIELDS = ['current_frame', 'current_chance', 'current_player_index', 'status']
+PLAYER_AUDIT_FIELDS = ['marks', 'score', 'score_state', 'final_score', 'date_finished']
+
+
+def audit_workers():
+    """Returns int number of processes auditing games, from BOWLING_AUDIT_WORKERS or the CPU count.
+
+    """
+    return getattr(settings, 'BOWLING_AUDIT_WORKERS', None) or os.cpu_count() or 1
+
+
+def game_ranges(start, end, chunk_size):
+    """Takes int start, int end and int chunk_size and yields tuples (low, high) of game pks covering start to end.
+
+    high is exclusive, so a range holds at most chunk_size games however
+    sparse the pks are.
+    """
+    for low in range(start, end + 1, chunk_size):
+        yield low, min(low + chunk_size, end + 1)
+
+
+def replay_game(game, game_players, rolls=None):
+    """Takes Game, list of its GamePlayers and optional list of (game_player_id, mark, frame, chance) rolls and returns the replay.
+
+    The rolls (its PlayerGame log, in the order bowled) are replayed through
+    Game.transition and the running score, skipping legacy marks outside
+    VALID_MARKS as the migrations do; without them the packed marks are
+    dealt out to whichever player the state machine says is up. Returns
+    tuple (dict state fields, dict of GamePlayer pk to score fields, list of
+    str issues found on the way).
+    """
+    issues = []
+    index_of = {game_player.pk: index for index, game_player in enumerate(game_players)}
+    replayed = {game_player.pk: GamePlayer(marks=b'', score_state='') for game_player in game_players}
+    if game.status == 0 and not rolls:
+        state = (game.current_frame, game.current_chance, game.current_player_index, 0)
+    else:
+        state = (1, 1, 0, 1)
+
+    def bowl(index, mark):
+        nonlocal state
+        replayed[game_players[index].pk].add_mark(mark)
+        state = Game.transition(*state, len(game_players), mark)
+
+    if rolls is None:
+        queues = [game_player.get_marks_list() for game_player in game_players]
+        while state[3] == 1 and queues[state[2]]:
+            bowl(state[2], queues[state[2]].pop(0))
+        if any(queues):
+            issues.append('Marks left over after replaying the roster in turn.')
+    else:
+        for game_player_id, mark, frame, chance in rolls:
+            if mark not in VALID_MARKS:
+                issues.append('Roll {!r} is not a valid mark, skipped.'.format(mark))
+                continue
+            if state[3] != 1:
+                issues.append('Roll {} bowled after the game finished.'.format(mark))
+                continue
+            if (index_of[game_player_id], frame, chance) != (state[2], state[0], state[1]):
+                issues.append('Roll {} logged as frame {} chance {} out of turn.'.format(mark, frame, chance))
+            bowl(index_of[game_player_id], mark)
+    finished = state[3] == -1
+    scores = {}
+    for game_player in game_players:
+        expected = replayed[game_player.pk]
+        marks = expected.get_marks_list()
+        scores[game_player.pk] = {
+            'marks': expected.marks,
+            'score': expected.score,
+            'score_state': expected.score_state,
+            'final_score': Game.calculate_score(marks) if finished else None,
+            'date_finished': (game_player.date_finished or game.date_updated) if finished else None
+        }
+    return dict(zip(GAME_AUDIT_FIELDS, state)), scores, issues
+
+
+def bulk_update(model, rows, fields):
+    """Takes model, dict of pk to dict of field values and list of fields and writes them with UPDATE ... CASE.
+
+    """
+    pks = list(rows)
+    for i in range(0, len(pks), UPDATE_BATCH_SIZE):
+        batch = pks[i:i + UPDATE_BATCH_SIZE]
+        model.objects.filter(pk__in=batch).update(**{
+            field: Case(
+                *[When(pk=pk, then=Value(rows[pk][field])) for pk in batch],
+                output_field=model._meta.get_field(field)
+            )
+            for field in fields
+        })
+
+
+def write_corrections(corrections):
+    """Takes dict of Game pk to tuple (int version read, dict state fields or None, dict of GamePlayer pk to score fields) and saves them, returning list of pks skipped.
+
+    Like save_state, a Game is only written if its version is still the one
+    the replay was read at; the rows are locked first, so a roll can't
+    commit in between. Games bowled meanwhile are skipped rather than
+    overwritten with an older replay. Every Game written gets a new version,
+    so cached states and responses built from the old one are not served.
+    """
+    with transaction.atomic():
+        versions = dict(Game.objects.select_for_update().filter(
+            pk__in=list(corrections)
+        ).values_list('id', 'version'))
+        written = {
+            pk: correction for pk, correction in corrections.items()
+            if versions.get(pk) == correction[0]
+        }
+        bulk_update(Game, {
+            pk: state for pk, (version, state, scores) in written.items() if state is not None
+        }, GAME_AUDIT_FIELDS)
+        bulk_update(GamePlayer, {
+            game_player_pk: fields
+            for version, state, scores in written.values()
+            for game_player_pk, fields in scores.items()
+        }, PLAYER_AUDIT_FIELDS)
+        Game.objects.filter(pk__in=list(written)).update(version=F('version') + 1, date_updated=timezone.now())
+    return sorted(set(corrections) - set(written))
+
+
+def stored_scores(game_player):
+    """Takes GamePlayer and returns its score fields shaped like those of replay_game.
+
+    """
+    return {
+        'marks': bytes(game_player.marks),
+        'score': game_player.score,
+        'score_state': game_player.get_score_state(),
+        'final_score': game_player.final_score,
+        'date_finished': game_player.date_finished
+    }
+
+
+def audit_range(low, high, fix=True):
+    """Takes int low, int high and bool fix and audits the Games with low <= pk < high, returning dict of results.
+
+    Each Game is replayed from its PlayerGame log, or from the packed marks
+    where the log is missing rolls (BOWLING_RECORD_ROLLS off), and stored
+    state or scores that disagree are corrected unless fix is False. Games
+    bowled after they were read are skipped and reported as issues.
+    """
+    games = list(Game.objects.filter(pk__gte=low, pk__lt=high).order_by('pk'))
+    rosters = {}
+    for game_player in GamePlayer.objects.filter(game_id__gte=low, game_id__lt=high).order_by('game_id', 'id'):
+        rosters.setdefault(game_player.game_id, []).append(game_player)
+    logs = {}
+    for row in PlayerGame.objects.filter(
+        player__game_id__gte=low,
+        player__game_id__lt=high
+    ).order_by('id').values_list('player__game_id', 'player_id', 'mark', 'frame__number', 'chance__number'):
+        logs.setdefault(row[0], []).append(row[1:])
+    result = {'low': low, 'high': high, 'games': len(games), 'corrected': 0, 'finished_changed': 0, 'issues': []}
+    corrections = {}
+    finished_changed = {}
+    for game in games:
+        game_players = rosters.get(game.pk, [])
+        if not game_players:
+            continue
+        rolls = logs.get(game.pk)
+        if rolls and len(rolls) < sum(len(game_player.get_marks_list()) for game_player in game_players):
+            result['issues'].append((game.pk, 'Roll log is incomplete, replaying the packed marks.'))
+            rolls = None
+        state, scores, issues = replay_game(game, game_players, rolls)
+        result['issues'] += [(game.pk, issue) for issue in issues]
+        if state == {field: getattr(game, field) for field in GAME_AUDIT_FIELDS}:
+            state = None
+        player_fixes = {}
+        for game_player in game_players:
+            expected = dict(scores[game_player.pk], score_state=json.loads(scores[game_player.pk]['score_state']))
+            if expected != stored_scores(game_player):
+                player_fixes[game_player.pk] = scores[game_player.pk]
+                if expected['final_score'] != game_player.final_score:
+                    finished_changed[game.pk] = finished_changed.get(game.pk, 0) + 1
+        if state is not None or player_fixes:
+            corrections[game.pk] = (game.version, state, player_fixes)
+    skipped = write_corrections(corrections) if fix and corrections else []
+    result['corrected'] = len(corrections) - len(skipped)
+    result['finished_changed'] = sum(
+        count for pk, count in finished_changed.items() if pk not in skipped
+    )
+    result['issues'] += [(pk, 'Bowled while being audited, skipped.') for pk in skipped]
+    return result
+
+
+def audit_range_worker(bounds):
+    """Takes tuple (low, high, fix) and returns audit_range's results for it, for Pool.imap.
+
+    """
+    return audit_range(*bounds)
+
+
+def audit_games(start, end, chunk_size=AUDIT_CHUNK_SIZE, workers=None, fix=True):
+    """Takes int start and end pks, int chunk_size, optional int workers and bool fix and yields each range's results in order.
+
+    Ranges of chunk_size pks are audited across workers processes (default
+    audit_workers(); 1 audits in this process), each reading and writing its
+    own games, so results arrive as soon as every range before them is done.
+    """
+    workers = workers or audit_workers()
+    ranges = ((low, high, fix) for low, high in game_ranges(start, end, chunk_size))
+    if workers == 1:
+        for bounds in ranges:
+            yield audit_range_worker(bounds)
+        return
+    # Forked workers must open their own connections rather than share these.
+    connections.close_all()
+    pool = Pool(workers)
+    try:
+        for result in pool.imap(audit_range_worker, ranges):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
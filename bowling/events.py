@@ -0,0 +1,135 @@
+from collections import OrderedDict, deque
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+import queue
+import threading
+
+
+EVENT_ENCODER = DjangoJSONEncoder(sort_keys=True, ensure_ascii=False)
+
+
+def format_event(event):
+    """Takes tuple (int id, str name, dict data) and returns it as a str Server-Sent Event.
+
+    """
+    event_id, name, data = event
+    return 'id: {}\nevent: {}\ndata: {}\n\n'.format(
+        event_id,
+        name,
+        EVENT_ENCODER.encode(data)
+    )
+
+
+def version_gap(event, last_sent):
+    """Takes event tuple and int id of the last event sent (or None) and returns bool of whether events between them are missing.
+
+    Events are published as their transactions commit, so a later version
+    can arrive before an earlier one, and versions bumped without an event
+    (e.g. by rescore_games) never arrive at all. Streams re-read the state
+    instead of skipping ahead.
+    """
+    return last_sent is not None and event[0] > last_sent + 1
+
+
+class EventHub(object):
+    """EventHub fans out each Game's events to every subscriber in this process.
+
+    Events are tuples (id, name, data) where id is the Game version the event
+    produced. The last BOWLING_EVENTS_BACKLOG events of each Game are kept so
+    a subscriber reconnecting with Last-Event-ID gets the ones it missed.
+    Backlogs of at most BOWLING_EVENTS_GAMES Games without subscribers are
+    kept, least recently published first to go.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = OrderedDict()
+
+    @property
+    def backlog(self):
+        return getattr(settings, 'BOWLING_EVENTS_BACKLOG', 64)
+
+    @property
+    def max_games(self):
+        return getattr(settings, 'BOWLING_EVENTS_GAMES', 1000)
+
+    def get_channel(self, pk):
+        """Takes game pk and returns its channel dict, creating it if missing; the lock must be held.
+
+        """
+        channel = self.channels.get(pk)
+        if channel is None:
+            channel = {'since': None, 'events': deque(), 'subscribers': set()}
+            self.channels[pk] = channel
+        self.channels.move_to_end(pk)
+        return channel
+
+    def publish(self, pk, event_id, name, data):
+        """Takes game pk, int event_id, str name and dict data and sends the event to every subscriber.
+
+        """
+        event = (event_id, name, data)
+        with self.lock:
+            channel = self.get_channel(pk)
+            if channel['since'] is None:
+                channel['since'] = event_id - 1
+            channel['events'].append(event)
+            while len(channel['events']) > self.backlog:
+                channel['since'] = channel['events'].popleft()[0]
+            subscribers = list(channel['subscribers'])
+            self.evict()
+        for subscriber in subscribers:
+            subscriber.put(event)
+
+    def subscribe(self, pk, last_event_id=None, subscriber=None):
+        """Takes game pk, optional int last_event_id and subscriber and returns tuple (subscriber, list or None).
+
+        The subscriber (a queue.Queue unless another object with put() is
+        given) receives every event published from now on. The list holds
+        the kept events after last_event_id, or is None if some of those were
+        not kept (or no last_event_id was given) and the subscriber needs the
+        full state instead.
+        """
+        if subscriber is None:
+            subscriber = queue.Queue()
+        with self.lock:
+            channel = self.get_channel(pk)
+            channel['subscribers'].add(subscriber)
+            missed = None
+            if (
+                last_event_id is not None and
+                channel['since'] is not None and
+                last_event_id >= channel['since']
+            ):
+                missed = sorted(event for event in channel['events'] if event[0] > last_event_id)
+        return subscriber, missed
+
+    def unsubscribe(self, pk, subscriber):
+        """Takes game pk and a subscriber returned by subscribe and stops sending events to it.
+
+        """
+        with self.lock:
+            channel = self.channels.get(pk)
+            if channel is not None:
+                channel['subscribers'].discard(subscriber)
+            self.evict()
+
+    def evict(self):
+        """Drops the least recently published channels without subscribers past max_games; the lock must be held.
+
+        """
+        for pk in list(self.channels):
+            if len(self.channels) <= self.max_games:
+                break
+            if not self.channels[pk]['subscribers']:
+                del self.channels[pk]
+
+    def clear(self):
+        """Drops every channel.
+
+        """
+        with self.lock:
+            self.channels = OrderedDict()
+
+
+EVENTS = EventHub()
@@ -0,0 +1,101 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from bowling.models import Game, GamePlayer
+from itertools import groupby
+import datetime
+import json
+
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_ENCODER = DjangoJSONEncoder(sort_keys=True, ensure_ascii=False)
+
+
+def export_rows(start=None, end=None, player=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Returns iterator of GamePlayers (with Game and Player) in export order.
+
+    Takes optional datetimes start (inclusive) and end (exclusive) on
+    Game.date_created and an optional Player pk the games must include. Rows
+    are read with QuerySet.iterator so only chunk_size of them are held at
+    once.
+    """
+    games = Game.objects.all()
+    if start is not None:
+        games = games.filter(date_created__gte=start)
+    if end is not None:
+        games = games.filter(date_created__lt=end)
+    if player is not None:
+        games = games.filter(players=player)
+    return GamePlayer.objects.filter(
+        game__in=games.values('id')
+    ).select_related(
+        'game',
+        'player'
+    ).order_by(
+        'game__date_created',
+        'game_id',
+        'id'
+    ).iterator(chunk_size=chunk_size)
+
+
+def game_record(game, game_players):
+    """Takes Game and its GamePlayers in roster order and returns dict of its history.
+
+    """
+    return {
+        'id': game.id,
+        'date_created': game.date_created,
+        'status': game.status,
+        'roster': [
+            {
+                'player': game_player.player_id,
+                'name': game_player.player.name,
+                'marks': game_player.get_marks_list(),
+                'frames': game_player.get_frame_scores(),
+                'score': game_player.score
+            }
+            for game_player in game_players
+        ]
+    }
+
+
+def parse_moment(value):
+    """Takes str date or datetime and returns aware datetime, raising ValueError if it is neither.
+
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError("Invalid date '{}'.".format(value))
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_filters(params):
+    """Takes dict-like params with optional str start, end and player and returns dict of export_rows filters.
+
+    Raises ValueError if one can't be read.
+    """
+    filters = {}
+    for name in ['start', 'end']:
+        if params.get(name):
+            filters[name] = parse_moment(params[name])
+    if params.get('player'):
+        try:
+            filters['player'] = int(params['player'])
+        except ValueError:
+            raise ValueError("Invalid player '{}'.".format(params['player']))
+    return filters
+
+
+def export_lines(**filters):
+    """Takes the filters of export_rows and yields one str JSON line per Game.
+
+    Games without any players have no history and are left out.
+    """
+    for game_id, game_players in groupby(export_rows(**filters), lambda row: row.game_id):
+        game_players = list(game_players)
+        yield EXPORT_ENCODER.encode(game_record(game_players[0].game, game_players)) + '\n'
@@ -0,0 +1,179 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from tastypie.models import ApiKey
+from bowling.models import Player
+from itertools import islice
+import csv
+import json
+import os
+
+
+IMPORT_CHUNK_SIZE = 500
+IMPORT_FIELDS = ['username', 'password', 'name', 'email']
+
+
+def import_workers():
+    """Returns int number of processes hashing passwords, from BOWLING_IMPORT_WORKERS or the CPU count.
+
+    """
+    return getattr(settings, 'BOWLING_IMPORT_WORKERS', None) or os.cpu_count() or 1
+
+
+def import_request_rows():
+    """Returns int most rows player/import takes in one request, from BOWLING_IMPORT_REQUEST_ROWS.
+
+    """
+    return getattr(settings, 'BOWLING_IMPORT_REQUEST_ROWS', 100)
+
+
+def read_rows(lines, format):
+    """Takes iterable of str lines and str format ('csv' or 'json') and yields dicts of player fields.
+
+    CSV needs a header row naming the columns (username, password, name and
+    optionally email). JSON is one object per line, either flat or shaped
+    like the body of player/create ({"name": ..., "user": {...}}). Lines that
+    can't be read yield str errors instead.
+    """
+    if format == 'csv':
+        for row in csv.DictReader(lines):
+            yield row
+    elif format == 'json':
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield 'Invalid JSON.'
+                continue
+            if not isinstance(row, dict):
+                yield 'Expected a JSON object.'
+                continue
+            if isinstance(row.get('user'), dict):
+                row = dict(row['user'], name=row.get('name'))
+            yield row
+    else:
+        raise ValueError("Invalid format '{}'.".format(format))
+
+
+def clean_row(row):
+    """Takes dict of player fields and returns it with str values, raising ValidationError if one is invalid.
+
+    """
+    row = {field: str(row.get(field) or '').strip() for field in IMPORT_FIELDS}
+    for field in ['username', 'password', 'name']:
+        if not row[field]:
+            raise ValidationError('{} is required.'.format(field))
+    User._meta.get_field('username').run_validators(row['username'])
+    User._meta.get_field('email').run_validators(row['email'])
+    Player._meta.get_field('name').run_validators(row['name'])
+    return row
+
+
+def hash_passwords(passwords, pool=None):
+    """Takes list of str passwords and optional executor pool and returns list of their hashes.
+
+    """
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // 32)))
+
+
+def create_players(rows):
+    """Takes list of (int index, dict row) with hashed passwords and creates their User, Player and ApiKey rows.
+
+    bulk_create sends no post_save, so the rows create_api_key,
+    create_user_player and save_user_player would add are created here.
+    """
+    User.objects.bulk_create([
+        User(username=row['username'], password=row['password'], email=row['email'])
+        for index, row in rows
+    ])
+    # Only some backends set the pks of bulk created rows.
+    user_ids = dict(User.objects.filter(
+        username__in=[row['username'] for index, row in rows]
+    ).values_list('username', 'id'))
+    Player.objects.bulk_create([
+        Player(user_id=user_ids[row['username']], name=row['name'])
+        for index, row in rows
+    ])
+    ApiKey.objects.bulk_create([
+        ApiKey(user_id=user_ids[row['username']], key=ApiKey().generate_key())
+        for index, row in rows
+    ])
+
+
+def import_chunk(rows, pool=None):
+    """Takes list of (int index, dict or str row) and returns tuple (int created, list of error dicts).
+
+    The chunk is created in one transaction. If that fails (e.g. a username
+    was taken meanwhile), its rows are created one at a time so only the
+    failing rows are reported.
+    """
+    errors = []
+    valid = []
+    for index, row in rows:
+        if isinstance(row, str):
+            errors.append({'row': index, 'username': None, 'error': row})
+            continue
+        try:
+            valid.append((index, clean_row(row)))
+        except ValidationError as e:
+            errors.append({'row': index, 'username': row.get('username'), 'error': ' '.join(e.messages)})
+    usernames = set()
+    existing = set(User.objects.filter(
+        username__in=[row['username'] for index, row in valid]
+    ).values_list('username', flat=True))
+    rows = []
+    for index, row in valid:
+        if row['username'] in existing or row['username'] in usernames:
+            errors.append({'row': index, 'username': row['username'], 'error': 'Username is taken.'})
+            continue
+        usernames.add(row['username'])
+        rows.append((index, row))
+    hashes = hash_passwords([row['password'] for index, row in rows], pool)
+    rows = [(index, dict(row, password=password)) for (index, row), password in zip(rows, hashes)]
+    try:
+        with transaction.atomic():
+            create_players(rows)
+        created = len(rows)
+    except IntegrityError:
+        created = 0
+        for index, row in rows:
+            try:
+                with transaction.atomic():
+                    create_players([(index, row)])
+                created += 1
+            except IntegrityError as e:
+                errors.append({'row': index, 'username': row['username'], 'error': str(e)})
+    return created, errors
+
+
+def import_players(rows, chunk_size=IMPORT_CHUNK_SIZE, workers=None):
+    """Takes iterable of dict (or str error) rows from read_rows and returns dict of the import's results.
+
+    Rows are validated, hashed and created chunk_size at a time, hashing
+    across workers processes (default import_workers(); 1 hashes in this
+    process). Invalid rows are reported with their 1-based row number in
+    'errors' and don't stop the others.
+    """
+    workers = workers or import_workers()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    result = {'created': 0, 'errors': []}
+    rows = enumerate(rows, 1)
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            created, errors = import_chunk(chunk, pool)
+            result['created'] += created
+            result['errors'] += sorted(errors, key=lambda error: error['row'])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return result
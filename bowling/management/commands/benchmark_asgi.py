@@ -0,0 +1,171 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.contrib.auth.models import Permission, User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test import RequestFactory
+from bowling.asgi import LaneApplication
+from bowling.events import EVENTS
+from bowling.management.commands.benchmark_lanes import percentile
+from bowling.managers import GameManager
+from bowling.models import Game
+import asyncio
+import time
+import uuid
+
+
+class Command(BaseCommand):
+    help = (
+        'Holds idle event streams open and measures get_state latency and '
+        'throughput through the WSGI handler (in a thread pool, as a threaded '
+        'server runs it) and through bowling.asgi.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--streams', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=32,
+                            help='Threads of the WSGI server.')
+        parser.add_argument('--timeout', type=float, default=5.0,
+                            help='Seconds a get_state may wait before it counts as timed out.')
+
+    def handle(self, *args, **options):
+        # Views run on other threads with their own connections, so the data
+        # is committed and deleted afterwards instead of rolled back.
+        # The user can't log in and only holds the lane permission, so one left
+        # behind by a killed run grants nothing.
+        user = User(username='asgi-benchmark-{}'.format(uuid.uuid4().hex[:12]))
+        user.set_unusable_password()
+        user.save()
+        user.user_permissions.add(Permission.objects.get(
+            content_type__app_label='bowling',
+            codename='change_game'
+        ))
+        game = GameManager.new_games([[user.player.id]])[0]
+        game.start()
+        self.authorization = 'ApiKey {}:{}'.format(user.username, user.api_key.key)
+        try:
+            self.run_wsgi(game.id, options)
+            self.run_asgi(game.id, options)
+        finally:
+            Game.objects.filter(id=game.id).delete()
+            user.player.delete()
+            user.delete()
+
+    def end_streams(self, pk):
+        """Publishes a final event for game pk so every stream of it returns.
+
+        """
+        EVENTS.publish(pk, Game.get_version(pk) + 1, 'state', {'state': None, 'status': -1})
+
+    def report(self, name, finished, start, timeouts):
+        """Writes get_state latencies (from when they were all sent) and throughput.
+
+        """
+        timings = sorted(end - start for end in finished)
+        if not timings:
+            self.stdout.write('{:<6} all {} timed out'.format(name, timeouts))
+            return
+        self.stdout.write('{:<6} p50 {:8.2f}ms  p99 {:8.2f}ms  {:7.1f} req/s  {} timed out'.format(
+            name,
+            percentile(timings, 0.5) * 1000,
+            percentile(timings, 0.99) * 1000,
+            len(timings) / timings[-1],
+            timeouts
+        ))
+
+    def run_wsgi(self, pk, options):
+        application = get_wsgi_application()
+        factory = RequestFactory(
+            HTTP_HOST='localhost',
+            HTTP_AUTHORIZATION=self.authorization
+        )
+
+        def call(path):
+            statuses = []
+            response = application(factory.get(path).environ, lambda status, headers: statuses.append(status))
+            try:
+                for chunk in response:
+                    pass
+            finally:
+                response.close()
+            if statuses[0] != '200 OK':
+                raise CommandError('{} did not return 200.'.format(path))
+            return time.perf_counter()
+
+        executor = ThreadPoolExecutor(max_workers=options['workers'])
+        try:
+            streams = [
+                executor.submit(call, '/bowling/game/{}/events/'.format(pk))
+                for x in range(options['streams'])
+            ]
+            start = time.perf_counter()
+            requests = [
+                executor.submit(call, '/bowling/game/{}/get_state/'.format(pk))
+                for x in range(options['requests'])
+            ]
+            done, pending = wait(requests, timeout=options['timeout'])
+            finished = [request.result() for request in done]
+            # Streams still queued never start; running ones end on the
+            # final event, published until none is left.
+            for future in streams + requests:
+                future.cancel()
+            while wait(streams + requests, timeout=0.5)[1]:
+                self.end_streams(pk)
+        finally:
+            executor.shutdown()
+        self.report('wsgi', finished, start, len(pending))
+
+    def run_asgi(self, pk, options):
+        application = LaneApplication(None)
+        headers = [
+            (b'host', b'localhost'),
+            (b'authorization', self.authorization.encode('latin1'))
+        ]
+        loop = asyncio.new_event_loop()
+
+        async def call(path, opened=None):
+            statuses = []
+            requested = [False]
+
+            async def receive():
+                if not requested[0]:
+                    requested[0] = True
+                    return {'type': 'http.request', 'body': b''}
+                # The client stays connected.
+                return await loop.create_future()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+                    if opened is not None:
+                        opened.set_result(None)
+
+            scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': headers}
+            await application(scope)(receive, send)
+            if statuses[0] != 200:
+                raise CommandError('{} did not return 200.'.format(path))
+            return time.perf_counter()
+
+        async def run():
+            opened = [loop.create_future() for x in range(options['streams'])]
+            streams = [
+                loop.create_task(call('/bowling/game/{}/events/'.format(pk), future))
+                for future in opened
+            ]
+            if opened:
+                await asyncio.wait(opened, loop=loop)
+            start = time.perf_counter()
+            requests = [
+                loop.create_task(call('/bowling/game/{}/get_state/'.format(pk)))
+                for x in range(options['requests'])
+            ]
+            done, pending = await asyncio.wait(requests, timeout=options['timeout'], loop=loop)
+            self.end_streams(pk)
+            await asyncio.wait(streams + requests, loop=loop)
+            return [request.result() for request in done], start, len(pending)
+
+        try:
+            finished, start, timeouts = loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.report('asgi', finished, start, timeouts)
@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.core.wsgi import get_wsgi_application
+from django.db import close_old_connections, transaction
+from django.test import RequestFactory
+from django.test.utils import setup_test_environment, teardown_test_environment
+from bowling.managers import GameManager
+import time
+
+
+def percentile(timings, fraction):
+    """Takes sorted list of float timings and returns the value at fraction (0-1).
+
+    """
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Compares p50/p99 latency of the Tastypie lane routes and the fast-path views through the WSGI handler.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        # Keep the connection (and the rolled-back transaction) across requests.
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                self.run(options['requests'])
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+
+    def run(self, requests):
+        user = User.objects.create_superuser(
+            'lane-benchmark', 'lane-benchmark@example.com', 'lane-benchmark'
+        )
+        application = get_wsgi_application()
+        factory = RequestFactory(HTTP_AUTHORIZATION='ApiKey lane-benchmark:{}'.format(
+            user.api_key.key
+        ))
+        statuses = []
+
+        def start_response(status, headers):
+            statuses.append(status)
+
+        routes = [
+            ('get_state', '/api/v1/game/{}/get_state/'),
+            ('get_state', '/bowling/game/{}/get_state/'),
+            ('bowl', '/api/v1/game/{}/bowl/?mark=0'),
+            ('bowl', '/bowling/game/{}/bowl/?mark=0'),
+        ]
+        for name, route in routes:
+            games = GameManager.new_games(
+                [[user.player.id]] * (requests // 20 + 1)
+            )
+            for game in games:
+                game.start()
+            timings = []
+            for x in range(requests):
+                game = games[x // 20] if name == 'bowl' else games[0]
+                environ = factory.get(route.format(game.id)).environ
+                start = time.perf_counter()
+                b''.join(application(environ, start_response))
+                timings.append(time.perf_counter() - start)
+                if statuses.pop() != '200 OK':
+                    raise CommandError('{} did not return 200.'.format(route))
+            timings.sort()
+            self.stdout.write('{:<40} p50 {:7.2f}ms  p99 {:7.2f}ms'.format(
+                route.format('<id>'),
+                percentile(timings, 0.5) * 1000,
+                percentile(timings, 0.99) * 1000
+            ))
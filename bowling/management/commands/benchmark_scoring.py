@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+from bowling.models import Game, TOTAL_FRAMES
+from bowling.scoring import encode_marks, score_rolls
+import random
+import time
+
+
+def random_rack():
+    """Returns list of str marks for up to two balls bowled at a full rack.
+
+    """
+    first = random.randint(0, 10)
+    if first == 10:
+        return ['x']
+    second = random.randint(0, 10 - first)
+    if first + second == 10:
+        return [str(first), '/']
+    return [str(first), str(second)]
+
+
+def random_frame(last_frame=False):
+    """Returns list of str marks for one randomly bowled frame.
+
+    """
+    marks = random_rack()
+    while last_frame and len(marks) < 3 and marks[-1] in ['/', 'x']:
+        marks.extend(random_rack())
+    return marks[:3]
+
+
+def random_game():
+    """Returns list of str marks for one randomly bowled game.
+
+    """
+    marks = []
+    for frame in range(1, TOTAL_FRAMES + 1):
+        marks.extend(random_frame(frame == TOTAL_FRAMES))
+    return marks
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the batch scorer against Game.calculate_score.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        games = [random_game() for _ in range(options['games'])]
+
+        start = time.perf_counter()
+        scalar = [Game.calculate_score(marks) for marks in games]
+        scalar_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rolls = encode_marks(games)
+        encode_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch, frames = score_rolls(rolls)
+        batch_time = time.perf_counter() - start
+
+        if list(batch) != scalar:
+            raise CommandError('Batch scores differ from calculate_score.')
+        self.stdout.write(
+            'games: {}\n'
+            'scalar: {:.3f}s\n'
+            'batch encode: {:.3f}s\n'
+            'batch score: {:.3f}s\n'
+            'speedup (score only): {:.1f}x'.format(
+                len(games),
+                scalar_time,
+                encode_time,
+                batch_time,
+                scalar_time / batch_time
+            )
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from bowling.export import EXPORT_CHUNK_SIZE, export_lines, parse_filters
+
+
+class Command(BaseCommand):
+    help = 'Writes the history of games as one JSON line per game.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Only games created on or after this date or datetime.')
+        parser.add_argument('--end', help='Only games created before this date or datetime.')
+        parser.add_argument('--player', help='Only games this Player id bowled in.')
+        parser.add_argument('--output', help='File to write to instead of stdout.')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_filters(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['output']:
+            output = open(options['output'], 'w', encoding='utf-8')
+        else:
+            output = self.stdout
+        try:
+            for line in export_lines(chunk_size=options['chunk_size'], **filters):
+                output.write(line)
+        finally:
+            if output is not self.stdout:
+                output.close()
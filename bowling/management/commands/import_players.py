@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from bowling.imports import IMPORT_CHUNK_SIZE, import_players, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Creates a player (with user and API key) for each row of a CSV or JSON lines roster file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Roster file; CSV needs a username,password,name[,email] header.')
+        parser.add_argument('--format', choices=['csv', 'json'],
+                            help='Defaults to csv for .csv files and json otherwise.')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument('--workers', type=int,
+                            help='Processes hashing passwords (default BOWLING_IMPORT_WORKERS or the CPU count).')
+
+    def handle(self, *args, **options):
+        format = options['format'] or ('csv' if options['path'].endswith('.csv') else 'json')
+        try:
+            roster = open(options['path'], encoding='utf-8', newline='')
+        except OSError as e:
+            raise CommandError(str(e))
+        with roster:
+            result = import_players(
+                read_rows(roster, format),
+                chunk_size=options['chunk_size'],
+                workers=options['workers']
+            )
+        for error in result['errors']:
+            self.stderr.write('Row {}{}: {}'.format(
+                error['row'],
+                ' ({})'.format(error['username']) if error['username'] else '',
+                error['error']
+            ))
+        self.stdout.write('Created {} players, {} rows failed.'.format(
+            result['created'],
+            len(result['errors'])
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from bowling.models import PlayerStats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes PlayerStats from the marks of finished games.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--player', type=int, action='append',
+                            help='Only rebuild this Player id (repeatable).')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        written = PlayerStats.rebuild(options['player'], chunk_size=options['chunk_size'])
+        self.stdout.write('Rebuilt stats of {} players.'.format(written))
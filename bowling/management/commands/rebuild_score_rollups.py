@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from bowling.models import ScoreRollup
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the daily and weekly ScoreRollups from the final scores of finished games.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        written = ScoreRollup.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write('Rebuilt {} rollups.'.format(written))
@@ -0,0 +1,105 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from bowling.audit import AUDIT_CHUNK_SIZE, audit_games
+from bowling.models import Game
+import json
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays every game from its roll log (or packed marks) and corrects '
+        'stored state and scores that disagree, a range of pks at a time '
+        'across a pool of processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=int, help='First game pk (default the lowest).')
+        parser.add_argument('--end', type=int, help='Last game pk (default the highest).')
+        parser.add_argument('--chunk-size', type=int, default=AUDIT_CHUNK_SIZE)
+        parser.add_argument('--workers', type=int,
+                            help='Processes auditing ranges (default BOWLING_AUDIT_WORKERS or the CPU count).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what disagrees without writing corrections.')
+        parser.add_argument('--checkpoint',
+                            help='File recording progress; an interrupted run given it again resumes from it.')
+
+    def read_checkpoint(self, path):
+        """Takes str path and returns dict of the saved progress, or None if there is none.
+
+        """
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path) as checkpoint:
+                return json.load(checkpoint)
+        except (OSError, ValueError) as e:
+            raise CommandError('Unreadable checkpoint {}: {}'.format(path, e))
+
+    def write_checkpoint(self, path, progress):
+        """Takes str path and dict progress and replaces the checkpoint with it.
+
+        """
+        with open(path + '.tmp', 'w') as checkpoint:
+            json.dump(progress, checkpoint)
+        os.replace(path + '.tmp', path)
+
+    def handle(self, *args, **options):
+        bounds = Game.objects.aggregate(start=Min('pk'), end=Max('pk'))
+        start = options['start'] if options['start'] is not None else bounds['start']
+        end = options['end'] if options['end'] is not None else bounds['end']
+        if start is None or end is None:
+            self.stdout.write('No games to audit.')
+            return
+        totals = {'games': 0, 'corrected': 0, 'finished_changed': 0, 'issues': 0}
+        progress = self.read_checkpoint(options['checkpoint'])
+        if progress is not None:
+            if progress['end'] != end:
+                raise CommandError('Checkpoint {} is for games up to {}, not {}.'.format(
+                    options['checkpoint'], progress['end'], end
+                ))
+            start = progress['next']
+            totals = progress['totals']
+            self.stdout.write('Resuming from game {}.'.format(start))
+        began = time.perf_counter()
+        audited = 0
+        for result in audit_games(
+            start,
+            end,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            fix=not options['dry_run']
+        ):
+            for pk, issue in result['issues']:
+                self.stderr.write('Game {}: {}'.format(pk, issue))
+            for key in ['games', 'corrected', 'finished_changed']:
+                totals[key] += result[key]
+            totals['issues'] += len(result['issues'])
+            audited += result['games']
+            if options['checkpoint']:
+                self.write_checkpoint(options['checkpoint'], {
+                    'next': result['high'],
+                    'end': end,
+                    'totals': totals
+                })
+            self.stdout.write('Games {}-{}: {} audited, {} corrected ({:.0f} games/s)'.format(
+                result['low'],
+                result['high'] - 1,
+                result['games'],
+                result['corrected'],
+                audited / max(time.perf_counter() - began, 1e-6)
+            ))
+        if options['checkpoint'] and os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+        self.stdout.write('{} {} games, {} {}, {} issues.'.format(
+            'Audited' if options['dry_run'] else 'Rescored',
+            totals['games'],
+            totals['corrected'],
+            'disagree' if options['dry_run'] else 'corrected',
+            totals['issues']
+        ))
+        if totals['finished_changed'] and not options['dry_run']:
+            self.stdout.write(
+                'Final scores changed; run rebuild_player_stats and rebuild_score_rollups.'
+            )
@@ -1,4 +1,5 @@
-from bowling.models import Frame, Chance, Game, Player, GamePlayer
+from bowling.models import Game, Player, GamePlayer, FRAMES, CHANCES
+from django.db import connection, transaction
 import re
 
 
@@ -13,6 +14,70 @@ class GameManager(object):
         GameManager.create_game_players(game, player_ids)
         return game
 
+    @staticmethod
+    def new_games(rosters):
+        """Takes list of lists of player ids and returns list of new Games, one per roster.
+
+        Players are validated with one in_bulk query; Games and GamePlayers are
+        created with bulk_create in a single transaction. Raises ValueError,
+        before anything is created, for an empty roster or an id that isn't a
+        whole number.
+        """
+        rosters = [GameManager.unique_ids(roster) for roster in rosters]
+        if not all(rosters):
+            raise ValueError('Every game needs at least one player.')
+        GameManager.setup()
+        player_ids = set(id for roster in rosters for id in roster)
+        players = Player.objects.in_bulk(list(player_ids))
+        missing = sorted(player_ids - set(players))
+        if missing:
+            raise Player.DoesNotExist(
+                'Players not found: {}'.format(', '.join(map(str, missing)))
+            )
+        with transaction.atomic():
+            games = GameManager.create_games(len(rosters))
+            GamePlayer.objects.bulk_create([
+                GamePlayer(player=players[id], game=game)
+                for game, roster in zip(games, rosters)
+                for id in roster
+            ])
+        return games
+
+    @staticmethod
+    def unique_ids(player_ids):
+        """Takes list of player ids and returns them as ints without repeats, in order.
+
+        """
+        ids = []
+        for id in player_ids:
+            id = GameManager.player_id(id)
+            if id not in ids:
+                ids.append(id)
+        return ids
+
+    @staticmethod
+    def player_id(value):
+        """Takes int or str player id and returns it as int, raising ValueError if it isn't a whole number.
+
+        """
+        if not isinstance(value, (int, str)) or isinstance(value, bool):
+            raise ValueError('Invalid player id {!r}.'.format(value))
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError('Invalid player id {!r}.'.format(value))
+
+    @staticmethod
+    def create_games(count):
+        """Takes int count and returns list of that many new Games.
+
+        Uses bulk_create where the database returns the new ids (PostgreSQL)
+        and falls back to one insert per Game elsewhere.
+        """
+        if connection.features.can_return_ids_from_bulk_insert:
+            return Game.objects.bulk_create([Game() for x in range(count)])
+        return [Game.objects.create() for x in range(count)]
+
     @staticmethod
     def create_game():
         game = Game.objects.create()
@@ -36,14 +101,10 @@ class GameManager(object):
     def setup_frames():
         total_frames = Game.total_frames()
         for x in range(1, total_frames + 1):
-            obj, created = Frame.objects.get_or_create(
-                number=x
-            )
+            FRAMES.get(x)
 
     @staticmethod
     def setup_chances():
         max_chances = Game.max_chances()
         for x in range(1, max_chances + 1):
-            obj, created = Chance.objects.get_or_create(
-                number=x
-            )
+            CHANCES.get(x)
@@ -0,0 +1,91 @@
+# Generated by Django 2.0.7 on 2018-07-20 14:12
+
+from django.db import migrations, models
+import json
+
+
+# Copies of the Game scoring helpers as they were when this migration was
+# written, so it doesn't change when the models do.
+
+VALID_MARKS = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '/', 'x']
+
+
+def chance_points(chance):
+    if chance == 'x' or chance == '/':
+        return 10
+    return int(chance)
+
+
+def new_score_state():
+    return {'frames': [], 'pending': [], 'open': None}
+
+
+def score_mark(score_state, mark):
+    frames = list(score_state['frames'])
+    pending = []
+    for index, needed, bonus in score_state['pending']:
+        bonus = bonus + [mark]
+        if len(bonus) < needed:
+            pending.append([index, needed, bonus])
+        elif needed == 2 and bonus[1] == '/':
+            frames[index] = 20
+        else:
+            frames[index] = 10 + sum(chance_points(b) for b in bonus)
+    open_mark = score_state['open']
+    if open_mark is None:
+        if mark == 'x':
+            frames.append(None)
+            pending.append([len(frames) - 1, 2, []])
+        else:
+            open_mark = mark
+    else:
+        if mark == '/':
+            frames.append(None)
+            pending.append([len(frames) - 1, 1, []])
+        else:
+            frames.append(chance_points(open_mark) + chance_points(mark))
+        open_mark = None
+    return {'frames': frames, 'pending': pending, 'open': open_mark}
+
+
+def score_state_total(score_state):
+    return sum(frame for frame in score_state['frames'] if frame is not None)
+
+
+def backfill_scores(apps, schema_editor):
+    GamePlayer = apps.get_model('bowling', 'GamePlayer')
+    PlayerGame = apps.get_model('bowling', 'PlayerGame')
+    for game_player in GamePlayer.objects.all():
+        score_state = new_score_state()
+        marks = PlayerGame.objects.filter(
+            player=game_player
+        ).order_by('frame__number', 'chance__number').values_list('mark', flat=True)
+        # Rolls from before marks were validated can't be scored; skip them
+        # as 0010 does when packing.
+        for mark in marks:
+            if mark in VALID_MARKS:
+                score_state = score_mark(score_state, mark)
+        game_player.score = score_state_total(score_state)
+        game_player.score_state = json.dumps(score_state)
+        game_player.save(update_fields=['score', 'score_state'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowling', '0008_game_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameplayer',
+            name='score',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='gameplayer',
+            name='score_state',
+            field=models.TextField(default=''),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
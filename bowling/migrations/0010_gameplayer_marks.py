@@ -0,0 +1,47 @@
+# Generated by Django 2.0.7 on 2018-07-21 10:37
+
+from django.db import migrations, models
+
+
+# Copies of the packing helpers as they were when this migration was written,
+# so it doesn't change when the models do.
+
+VALID_MARKS = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '/', 'x']
+MARK_CODES = {mark: code for code, mark in enumerate(VALID_MARKS)}
+NO_MARK = 15
+
+
+def pack_marks(marks):
+    codes = [MARK_CODES[mark] for mark in marks]
+    if len(codes) % 2:
+        codes.append(NO_MARK)
+    return bytes(codes[i] << 4 | codes[i + 1] for i in range(0, len(codes), 2))
+
+
+def backfill_marks(apps, schema_editor):
+    GamePlayer = apps.get_model('bowling', 'GamePlayer')
+    PlayerGame = apps.get_model('bowling', 'PlayerGame')
+    for game_player in GamePlayer.objects.all():
+        marks = PlayerGame.objects.filter(
+            player=game_player
+        ).order_by('frame__number', 'chance__number').values_list('mark', flat=True)
+        game_player.marks = pack_marks(
+            [mark for mark in marks if mark in VALID_MARKS]
+        )
+        game_player.save(update_fields=['marks'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowling', '0009_gameplayer_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameplayer',
+            name='marks',
+            field=models.BinaryField(default=b'', max_length=11),
+        ),
+        migrations.RunPython(backfill_marks, migrations.RunPython.noop),
+    ]
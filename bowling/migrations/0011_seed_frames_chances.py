@@ -0,0 +1,28 @@
+# Generated by Django 2.0.7 on 2018-07-21 16:02
+
+from django.db import migrations
+
+TOTAL_FRAMES = 10
+MAX_CHANCES = 3
+
+
+def seed_reference_rows(apps, schema_editor):
+    Frame = apps.get_model('bowling', 'Frame')
+    Chance = apps.get_model('bowling', 'Chance')
+    for number in range(1, TOTAL_FRAMES + 1):
+        if not Frame.objects.filter(number=number).exists():
+            Frame.objects.create(number=number)
+    for number in range(1, MAX_CHANCES + 1):
+        if not Chance.objects.filter(number=number).exists():
+            Chance.objects.create(number=number)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowling', '0010_gameplayer_marks'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_reference_rows, migrations.RunPython.noop),
+    ]
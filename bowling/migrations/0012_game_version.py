@@ -0,0 +1,18 @@
+# Generated by Django 2.0.7 on 2018-07-24 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowling', '0011_seed_frames_chances'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.0.7 on 2018-07-25 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowling', '0012_game_version'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='gameplayer',
+            unique_together={('player', 'game')},
+        ),
+        migrations.AddIndex(
+            model_name='playergame',
+            index=models.Index(fields=['player', 'frame', 'chance'], name='bowling_pg_player_frame_idx'),
+        ),
+        migrations.RunSQL(
+            ['CREATE INDEX bowling_game_active_idx ON bowling_game (status) WHERE status = 1'],
+            ['DROP INDEX bowling_game_active_idx']
+        ),
+    ]
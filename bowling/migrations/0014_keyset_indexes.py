@@ -0,0 +1,21 @@
+# Generated by Django 2.0.7 on 2018-07-26 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowling', '0013_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['date_created', 'id'], name='bowling_game_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playergame',
+            index=models.Index(fields=['date_created', 'id'], name='bowling_pg_created_idx'),
+        ),
+    ]
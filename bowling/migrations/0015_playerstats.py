@@ -0,0 +1,32 @@
+# Generated by Django 2.0.7 on 2018-07-29 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowling', '0014_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerStats',
+            fields=[
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='bowling.Player')),
+                ('games', models.IntegerField(default=0)),
+                ('total_score', models.IntegerField(default=0)),
+                ('high_game', models.IntegerField(default=0)),
+                ('strikes', models.IntegerField(default=0)),
+                ('strike_chances', models.IntegerField(default=0)),
+                ('spares', models.IntegerField(default=0)),
+                ('spare_chances', models.IntegerField(default=0)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'PlayerStats',
+                'verbose_name_plural': 'PlayerStats',
+            },
+        ),
+    ]
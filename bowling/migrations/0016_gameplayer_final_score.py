@@ -0,0 +1,48 @@
+# Generated by Django 2.0.7 on 2018-07-30 11:05
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def store_final_scores(apps, schema_editor):
+    Game = apps.get_model('bowling', 'Game')
+    GamePlayer = apps.get_model('bowling', 'GamePlayer')
+    GamePlayer.objects.filter(game__status=-1).update(
+        final_score=F('score'),
+        date_finished=Subquery(
+            Game.objects.filter(pk=OuterRef('game_id')).values('date_updated')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowling', '0015_playerstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameplayer',
+            name='date_finished',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gameplayer',
+            name='final_score',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='gameplayer',
+            index=models.Index(fields=['-final_score', '-id'], name='bowling_gp_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gameplayer',
+            index=models.Index(fields=['player', '-final_score', '-id'], name='bowling_gp_player_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gameplayer',
+            index=models.Index(fields=['date_finished'], name='bowling_gp_finished_idx'),
+        ),
+        migrations.RunPython(store_final_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.0.7 on 2018-07-31 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowling', '0016_gameplayer_final_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('games', models.IntegerField(default=0)),
+                ('total_score', models.IntegerField(default=0)),
+                ('high_game', models.IntegerField(default=0)),
+                ('strikes', models.IntegerField(default=0)),
+                ('strike_chances', models.IntegerField(default=0)),
+                ('spares', models.IntegerField(default=0)),
+                ('spare_chances', models.IntegerField(default=0)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('start', models.DateField()),
+            ],
+            options={
+                'verbose_name': 'ScoreRollup',
+                'verbose_name_plural': 'ScoreRollups',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='scorerollup',
+            unique_together={('period', 'start')},
+        ),
+    ]
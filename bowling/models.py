@@ -1,9 +1,20 @@
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
-from django.core.exceptions import ObjectDoesNotExist
-from django.db.models.signals import post_save
+from django.core.cache import caches
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Max
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.http import quote_etag
 from tastypie.models import create_api_key
+from bowling.events import EVENTS
+from types import MappingProxyType
+import datetime
+import json
+import threading
+import time
 
 # Constants
 
@@ -20,6 +31,29 @@ FRAME_CHANCES = {
     9: 2,
     10: 3
 }
+VALID_MARKS = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '/', 'x']
+MAX_MARKS = 21
+MARK_CODES = {mark: code for code, mark in enumerate(VALID_MARKS)}
+NO_MARK = 15
+STATE_FIELDS = [
+    'current_frame',
+    'current_chance',
+    'current_player_index',
+    'status',
+    'date_updated'
+]
+SCORE_FIELDS = ['marks', 'score', 'score_state', 'date_updated']
+TOTAL_FIELDS = [
+    'games',
+    'total_score',
+    'high_game',
+    'strikes',
+    'strike_chances',
+    'spares',
+    'spare_chances'
+]
+ROLLUP_PERIODS = [('day', 'Day'), ('week', 'Week')]
+MAX_WRITE_ATTEMPTS = 3
 
 # Create API Key when User is created
 post_save.connect(create_api_key, sender=User)
@@ -98,6 +132,178 @@ class Chance(models.Model):
         )
 
 
+class ReferenceCache(object):
+    """ReferenceCache is a process-wide, read-only map of number to row for Frame or Chance.
+
+    """
+    ttl = 300
+
+    def __init__(self, model):
+        self.model = model
+        self._rows = None
+        self._loaded = 0
+
+    def get_rows(self):
+        """Returns the immutable number -> row map, loading it if missing or expired.
+
+        """
+        rows = self._rows
+        if rows is None or time.monotonic() - self._loaded > self.ttl:
+            loaded = {}
+            for obj in self.model.objects.order_by('-id'):
+                loaded[obj.number] = obj
+            rows = MappingProxyType(loaded)
+            self._rows = rows
+            self._loaded = time.monotonic()
+        return rows
+
+    def get(self, number):
+        """Takes int number and returns row, creating it if missing.
+
+        """
+        try:
+            return self.get_rows()[number]
+        except KeyError:
+            obj, created = self.model.objects.get_or_create(number=number)
+            self.clear()
+            return obj
+
+    def clear(self):
+        """Drops the map so it is reloaded on next use.
+
+        """
+        self._rows = None
+
+
+FRAMES = ReferenceCache(Frame)
+CHANCES = ReferenceCache(Chance)
+
+
+@receiver([post_save, post_delete], sender=Frame)
+def clear_frames(sender, **kwargs):
+    """Drops cached Frames when a Frame changes.
+
+    """
+    FRAMES.clear()
+
+
+@receiver([post_save, post_delete], sender=Chance)
+def clear_chances(sender, **kwargs):
+    """Drops cached Chances when a Chance changes.
+
+    """
+    CHANCES.clear()
+
+
+class GameConflict(Exception):
+    """Raised when a Game was changed by someone else since it was loaded.
+
+    """
+    pass
+
+
+class ContentionStats(object):
+    """ContentionStats counts the outcomes of optimistic Game state writes.
+
+    """
+    fields = ['writes', 'conflicts', 'retried_writes', 'failures']
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Sets every counter back to 0.
+
+        """
+        with self.lock:
+            for name in self.fields:
+                setattr(self, name, 0)
+
+    def record(self, name):
+        """Takes str counter name and adds 1 to it.
+
+        """
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self):
+        """Returns dict of counter name to int value.
+
+        """
+        with self.lock:
+            return {name: getattr(self, name) for name in self.fields}
+
+
+GAME_CONTENTION = ContentionStats()
+
+
+class GameStateCache(object):
+    """GameStateCache keeps each Game's roster, state and scores in a Django cache.
+
+    Writers store the entry after every change (write-through). Entries are
+    only served for the Game version read from the database, so an entry
+    built from an older version, e.g. in a process that did not take the
+    latest roll, is rebuilt instead. The cache alias is set with
+    BOWLING_STATE_CACHE; its TIMEOUT bounds how long a renamed Player can
+    show up under the old name.
+    """
+    prefix = 'bowling:game-state'
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'BOWLING_STATE_CACHE', 'default')]
+
+    def state_key(self, pk):
+        return '{}:{}'.format(self.prefix, int(pk))
+
+    def get(self, pk, version):
+        """Takes game pk and int version and returns the cached entry dict, or None if it is missing or of another version.
+
+        """
+        entry = self.cache.get(self.state_key(pk))
+        if entry is None or entry['version'] != version:
+            return None
+        return entry
+
+    def store(self, game):
+        """Takes Game and caches its roster, state and scores as of its version, returning the entry.
+
+        """
+        entry = {
+            'version': game.version,
+            'roster': [game_player.player.name for game_player in game.get_gameplayers()],
+            'frame': game.current_frame,
+            'chance': game.current_chance,
+            'player_index': game.current_player_index,
+            'status': game.status,
+            'scores': game.get_scores()
+        }
+        self.cache.set(self.state_key(game.pk), entry)
+        return entry
+
+    def discard(self, pk):
+        """Takes game pk and drops its cached entry.
+
+        """
+        self.cache.delete(self.state_key(pk))
+
+    @staticmethod
+    def as_state(entry):
+        """Takes cached entry dict and returns it shaped like Game.get_state(), naming the current Player.
+
+        """
+        return {
+            'frame': entry['frame'],
+            'chance': entry['chance'],
+            'player': entry['roster'][entry['player_index']] if entry['roster'] else None,
+            'scores': entry['scores']
+        }
+
+
+GAME_STATES = GameStateCache()
+
+
 class Game(models.Model):
     """Game has many Players and the state of a bowling game.
 
@@ -109,16 +315,31 @@ class Game(models.Model):
     current_chance = models.IntegerField(default=0)
     current_player_index = models.IntegerField(default=0)
     status = models.IntegerField(default=0)
+    version = models.IntegerField(default=0)
 
     class Meta:
         verbose_name = 'Game'
         verbose_name_plural = 'Games'
+        indexes = [
+            models.Index(
+                fields=['date_created', 'id'],
+                name='bowling_game_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return '{}'.format(
             self.date_created
         )
 
+    def save(self, *args, **kwargs):
+        """Saves Game, bumping version on full saves so concurrent writers notice.
+
+        """
+        if self.pk is not None and kwargs.get('update_fields') is None:
+            self.version += 1
+        super(Game, self).save(*args, **kwargs)
+
     @staticmethod
     def total_frames():
         """Returns int value representing max number of frames in a game.
@@ -187,12 +408,108 @@ class Game(models.Model):
                 x += 2
         return score
 
+    @staticmethod
+    def new_score_state():
+        """Returns dict representing the running score state of a Player with no marks.
+
+        """
+        return {'frames': [], 'pending': [], 'open': None}
+
+    @staticmethod
+    def score_mark(score_state, mark):
+        """Takes dict score_state and str mark and returns the updated running score state.
+
+        Applies calculate_score one mark at a time. 'frames' holds a total per frame
+        (None while a strike/spare bonus is pending), 'pending' holds
+        [frame index, bonus marks needed, bonus marks seen] and 'open' holds the
+        first mark of an unfinished frame.
+        """
+        frames = list(score_state['frames'])
+        pending = []
+        for index, needed, bonus in score_state['pending']:
+            bonus = bonus + [mark]
+            if len(bonus) < needed:
+                pending.append([index, needed, bonus])
+            elif needed == 2 and bonus[1] == '/':
+                frames[index] = 20
+            else:
+                frames[index] = 10 + sum(Game.chance_points(b) for b in bonus)
+        open_mark = score_state['open']
+        if open_mark is None:
+            if mark == 'x':
+                frames.append(None)
+                pending.append([len(frames) - 1, 2, []])
+            else:
+                open_mark = mark
+        else:
+            if mark == '/':
+                frames.append(None)
+                pending.append([len(frames) - 1, 1, []])
+            else:
+                frames.append(
+                    Game.chance_points(open_mark) +
+                    Game.chance_points(mark)
+                )
+            open_mark = None
+        return {'frames': frames, 'pending': pending, 'open': open_mark}
+
+    @staticmethod
+    def score_state_total(score_state):
+        """Takes dict score_state and returns (int) score of its resolved frames.
+
+        """
+        return sum(
+            frame for frame in score_state['frames'] if frame is not None
+        )
+
+    @staticmethod
+    def has_extra_chance(frame, chance, prev_mark):
+        """Takes int frame, int chance and str prev_mark and returns bool representing whether another chance is given.
+
+        """
+        if chance < Game.frame_chances(frame):
+            if frame == Game.total_frames():
+                if chance == 1:
+                    return True
+                elif chance != 1 and prev_mark in ['/', 'x']:
+                    return True
+                else:
+                    return False
+            else:
+                if prev_mark in ['/', 'x']:
+                    return False
+                else:
+                    return True
+        return False
+
+    @staticmethod
+    def transition(frame, chance, player_index, status, number_of_players, prev_mark):
+        """Returns tuple (frame, chance, player_index, status) following prev_mark.
+
+        Pure version of the state machine behind next(); nothing is saved.
+        """
+        if status == 0 or status == -1:
+            return frame, chance, player_index, status
+        if Game.has_extra_chance(frame, chance, prev_mark):
+            return frame, chance + 1, player_index, status
+        if player_index == number_of_players - 1:
+            if frame < Game.total_frames():
+                frame += 1
+                chance = 1
+            else:
+                status = -1
+            player_index = 0
+        else:
+            chance = 1
+            player_index += 1
+        return frame, chance, player_index, status
+
     @property
     def number_of_players(self):
         """Returns int representing number of players for game.
 
         """
-        return len(self.players.all())
+        return len(self.get_gameplayers())
 
     @property
     def current_player(self):
@@ -200,7 +517,7 @@ class Game(models.Model):
 
         """
         if self.number_of_players:
-            return self.players.all()[self.current_player_index]
+            return self.get_gameplayers()[self.current_player_index].player
         else:
             return None
 
@@ -236,7 +553,7 @@ class Game(models.Model):
 
         """
         if index < self.number_of_players:
-            return self.players.all()[index]
+            return self.get_gameplayers()[index].player
         else:
             return None
 
@@ -251,29 +568,250 @@ class Game(models.Model):
             'scores': self.get_scores()
         }
 
-    def get_gameplayer(self, player):
-        """Takes Player and returns GamePlayer.
+    @staticmethod
+    def get_version(pk):
+        """Takes int pk and returns int version of Game, or None if there is no such Game.
 
+        Reads the version column alone with one primary key lookup.
         """
         try:
-            game_player = GamePlayer.objects.get(
-                player=player,
-                game=self
-            )
-            return game_player
-        except ObjectDoesNotExist:
+            return Game.objects.filter(pk=pk).values_list('version', flat=True).first()
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def get_version_status(pk):
+        """Takes int pk and returns tuple (int version, int status, str roster stamp) of Game, or None if there is no such Game.
+
+        Version and status are read with one primary key lookup. Only a
+        finished Game, whose responses are stored, gets a roster_stamp; the
+        stamp of any other Game is ''.
+        """
+        try:
+            row = Game.objects.filter(pk=pk).values_list('version', 'status').first()
+        except (TypeError, ValueError):
             return None
+        if row is None:
+            return None
+        version, status = row
+        return version, status, Game.roster_stamp(pk) if status == -1 else ''
+
+    @staticmethod
+    def roster_stamp(pk):
+        """Takes int pk and returns str stamp of the GamePlayers, Players and PlayerGames of Game.
+
+        The stamp changes whenever one of them is saved, added or removed, in
+        any process. A Player is saved whenever its User is, so it covers
+        User edits too. Responses embedding them are validated with version
+        and stamp together.
+        """
+        row = GamePlayer.objects.filter(game_id=pk).aggregate(
+            gameplayers_updated=Max('date_updated'),
+            players_updated=Max('player__date_updated'),
+            rolls_updated=Max('playergame__date_updated'),
+            gameplayer_count=Count('id', distinct=True),
+            roll_count=Count('playergame', distinct=True)
+        )
+        updated = max([
+            row[name] for name in ['gameplayers_updated', 'players_updated', 'rolls_updated']
+            if row[name] is not None
+        ], default=None)
+        return '{}-{}-{}'.format(
+            updated.timestamp() if updated else 0,
+            row['gameplayer_count'],
+            row['roll_count']
+        )
+
+    @staticmethod
+    def state_etag(pk, version, variant=''):
+        """Takes int pk, int version and optional str variant and returns quoted str ETag for that state of Game.
+
+        Every roll, start and full save bumps version, so the ETag changes
+        exactly when the state does. variant tells apart representations of
+        the same state (format, fields, depth).
+        """
+        tag = 'game-{}-{}'.format(pk, version)
+        if variant:
+            tag = '{}-{}'.format(tag, variant)
+        return quote_etag(tag)
+
+    @staticmethod
+    def get_cached_state(pk, version=None):
+        """Takes int pk and optional int version and returns tuple (int version, int status, dict state) of Game, reading GAME_STATES first.
+
+        Only the version column is read on a hit, and nothing when the caller
+        already read version. A missing entry, or one of another version, is
+        rebuilt from the database and cached. Raises Game.DoesNotExist if
+        there is no such Game.
+        """
+        if version is None:
+            version = Game.get_version(pk)
+        if version is None:
+            raise Game.DoesNotExist()
+        entry = GAME_STATES.get(pk, version)
+        if entry is None:
+            entry = GAME_STATES.store(Game.get_with_roster(pk))
+        return entry['version'], entry['status'], GameStateCache.as_state(entry)
+
+    @staticmethod
+    def get_with_roster(pk):
+        """Takes int pk and returns Game with its roster already loaded, usually in one query.
+
+        """
+        game_players = list(
+            GamePlayer.objects.filter(
+                game_id=pk
+            ).select_related('game', 'player').order_by('id')
+        )
+        if not game_players:
+            game = Game.objects.get(pk=pk)
+        else:
+            game = game_players[0].game
+            for game_player in game_players:
+                game_player.game = game
+        game._gameplayers = game_players
+        return game
+
+    def get_gameplayers(self):
+        """Returns list of GamePlayers (with their Players) for game in roster order.
+
+        The roster is loaded with a single query and kept on the instance, so
+        scores and the current player are read without further queries.
+        """
+        if getattr(self, '_gameplayers', None) is None:
+            self._gameplayers = list(
+                GamePlayer.objects.filter(
+                    game=self
+                ).select_related('player').order_by('id')
+            )
+        return self._gameplayers
+
+    def get_gameplayer(self, player):
+        """Takes Player and returns GamePlayer.
+
+        """
+        for game_player in self.get_gameplayers():
+            if player is not None and game_player.player_id == player.id:
+                return game_player
+        return None
 
     def start(self):
         """Sets state to start game and returns representation of that state.
 
+        A game that has begun or is over is left as it is, so its rolls,
+        final scores, stats and rollups are never counted twice.
         """
-        self.current_frame = 1
-        self.current_chance = 1
-        self.status = 1
-        self.save()
+        def start_game():
+            if self.is_game_over:
+                return 'Game is Over!'
+            if self.has_game_begun:
+                return 'Game has already Started!'
+            self.current_frame = 1
+            self.current_chance = 1
+            self.status = 1
+            if not self.save_state():
+                raise GameConflict()
+        refused = self.retry_on_conflict(start_game)
+        if refused is not None:
+            return refused
+        entry = GAME_STATES.store(self)
+        self.publish_event('state', {
+            'state': GameStateCache.as_state(entry),
+            'status': self.status
+        })
         return self.get_state()
 
+    def roll_event(self, player_games):
+        """Takes list of PlayerGames just bowled and returns dict of what changed, for live feeds.
+
+        Holds the rolls, the new state, the new scores of the players who
+        bowled (keyed like get_scores) and status; everything is read from
+        the loaded roster.
+        """
+        game_players = self.get_gameplayers()
+        rolls = []
+        scores = {}
+        for player_game in player_games:
+            game_player = player_game.player
+            rolls.append({
+                'player': game_player.player.name,
+                'frame': player_game.frame.number,
+                'chance': player_game.chance.number,
+                'mark': player_game.mark
+            })
+            scores[game_players.index(game_player)] = {
+                game_player.player.name: self.get_player_score(game_player)
+            }
+        current_player = self.current_player
+        return {
+            'rolls': rolls,
+            'state': {
+                'frame': self.current_frame,
+                'chance': self.current_chance,
+                'player': current_player.name if current_player else None
+            },
+            'scores': scores,
+            'status': self.status
+        }
+
+    def publish_event(self, name, data):
+        """Takes str event name and dict data and publishes them to EVENTS once the current transaction commits.
+
+        """
+        pk = self.pk
+        version = self.version
+        transaction.on_commit(lambda: EVENTS.publish(pk, version, name, data))
+
+    def save_state(self):
+        """Saves state fields if version is unchanged in the database and returns bool of success.
+
+        The compare-and-swap is a single UPDATE ... WHERE version = n, so no row
+        lock is held while the new state is computed.
+        """
+        updated = Game.objects.filter(
+            pk=self.pk,
+            version=self.version
+        ).update(
+            current_frame=self.current_frame,
+            current_chance=self.current_chance,
+            current_player_index=self.current_player_index,
+            status=self.status,
+            version=F('version') + 1,
+            date_updated=timezone.now()
+        )
+        if updated:
+            self.version += 1
+        return bool(updated)
+
+    def reload_state(self):
+        """Reloads state fields and roster from the database.
+
+        """
+        self.refresh_from_db(fields=STATE_FIELDS + ['version'])
+        self._gameplayers = None
+
+    def retry_on_conflict(self, attempt):
+        """Takes callable attempt and calls it until it finishes without GameConflict.
+
+        State is reloaded between attempts; after MAX_WRITE_ATTEMPTS conflicts
+        'Game is Busy!' is returned.
+        """
+        for tries in range(MAX_WRITE_ATTEMPTS):
+            if tries:
+                self.reload_state()
+            try:
+                result = attempt()
+            except GameConflict:
+                GAME_CONTENTION.record('conflicts')
+                continue
+            GAME_CONTENTION.record('writes')
+            if tries:
+                GAME_CONTENTION.record('retried_writes')
+            return result
+        GAME_CONTENTION.record('failures')
+        self.reload_state()
+        return 'Game is Busy!'
+
     def reset_current_chance(self):
         """Sets current_chance back to 1.
 
@@ -306,60 +844,156 @@ class Game(models.Model):
         """Takes str prev_mark of Player and returns bool representing whether another chance is given.
 
         """
-        if self.current_chance < Game.frame_chances(self.current_frame):
-            if self.current_frame == Game.total_frames():
-                if self.current_chance == 1:
-                    return True
-                elif self.current_chance != 1 and prev_mark in ['/', 'x']:
-                    return True
-                else:
-                    return False
-            else:
-                if prev_mark in ['/', 'x']:
-                    return False
-                else:
-                    return True
-        return False
+        return Game.has_extra_chance(
+            self.current_frame,
+            self.current_chance,
+            prev_mark
+        )
 
     def next(self, prev_mark):
         """Advances current state to next state.
 
         """
-        if self.is_game_active:
-            if self.extra_chance(prev_mark):
-                self.current_chance += 1
-            else:
-                if self.current_player_index == self.number_of_players - 1:
-                    self.next_frame()
-                else:
-                    self.reset_current_chance()
-                self.next_player()
-        self.save()
+        (
+            self.current_frame,
+            self.current_chance,
+            self.current_player_index,
+            self.status
+        ) = Game.transition(
+            self.current_frame,
+            self.current_chance,
+            self.current_player_index,
+            self.status,
+            self.number_of_players,
+            prev_mark
+        )
+        if not self.save_state():
+            raise GameConflict()
 
     def bowl(self, mark):
         """Takes a str mark and creates and returns PlayerGame.
 
+        """
+        result = self.retry_on_conflict(lambda: self.apply_bowl(mark))
+        GAME_STATES.store(self)
+        if isinstance(result, PlayerGame):
+            self.publish_event('bowl', self.roll_event([result]))
+        return result
+
+    def apply_bowl(self, mark):
+        """Takes a str mark and bowls it once, raising GameConflict if the game changed meanwhile.
+
         """
         if self.is_game_over:
             return 'Game is Over!'
         if not self.has_game_begun:
             return 'Game has not Started!'
-        frame = Frame.objects.get(number=self.current_frame)
-        chance = Chance.objects.get(number=self.current_chance)
-        player_game = PlayerGame.objects.create(
-            player=self.get_gameplayer(self.current_player),
+        if mark not in VALID_MARKS:
+            return 'Invalid Mark!'
+        frame = FRAMES.get(self.current_frame)
+        chance = CHANCES.get(self.current_chance)
+        game_player = self.get_gameplayer(self.current_player)
+        player_game = PlayerGame(
+            player=game_player,
             mark=mark,
             frame=frame,
             chance=chance
         )
-        self.next(mark)
+        with transaction.atomic():
+            self.next(mark)
+            if getattr(settings, 'BOWLING_RECORD_ROLLS', True):
+                player_game.save()
+            game_player.add_mark(mark)
+            game_player.save(update_fields=SCORE_FIELDS)
+            if self.status == -1:
+                self.record_finish()
         return player_game
 
+    def bowl_many(self, marks):
+        """Takes list of str marks, bowls them in order and returns list of PlayerGames.
+
+        Every mark is checked against the state machine before anything is
+        written. PlayerGames are then inserted with one bulk_create, each
+        GamePlayer bowling in the batch is updated once and the game state is
+        saved with one UPDATE, all in one transaction.
+        """
+        result = self.retry_on_conflict(lambda: self.apply_bowls(marks))
+        GAME_STATES.store(self)
+        if isinstance(result, list) and result:
+            self.publish_event('bowl', self.roll_event(result))
+        return result
+
+    def apply_bowls(self, marks):
+        """Takes list of str marks and bowls them once, raising GameConflict if the game changed meanwhile.
+
+        """
+        if self.is_game_over:
+            return 'Game is Over!'
+        if not self.has_game_begun:
+            return 'Game has not Started!'
+        game_players = self.get_gameplayers()
+        state = (
+            self.current_frame,
+            self.current_chance,
+            self.current_player_index,
+            self.status
+        )
+        player_games = []
+        for mark in marks:
+            if state[3] == -1:
+                return 'Game is Over!'
+            if mark not in VALID_MARKS:
+                return 'Invalid Mark!'
+            player_games.append(PlayerGame(
+                player=game_players[state[2]],
+                mark=mark,
+                frame=FRAMES.get(state[0]),
+                chance=CHANCES.get(state[1])
+            ))
+            state = Game.transition(*state, len(game_players), mark)
+        bowled = []
+        for player_game in player_games:
+            player_game.player.add_mark(player_game.mark)
+            if player_game.player not in bowled:
+                bowled.append(player_game.player)
+        (
+            self.current_frame,
+            self.current_chance,
+            self.current_player_index,
+            self.status
+        ) = state
+        with transaction.atomic():
+            if not self.save_state():
+                raise GameConflict()
+            if getattr(settings, 'BOWLING_RECORD_ROLLS', True):
+                PlayerGame.objects.bulk_create(player_games)
+            for game_player in bowled:
+                game_player.save(update_fields=SCORE_FIELDS)
+            if self.status == -1:
+                self.record_finish()
+        return player_games
+
+    def record_finish(self):
+        """Stores the final scores of a Game that just finished and adds it to its Players' stats and rollups.
+
+        """
+        date_finished = timezone.now()
+        GamePlayer.objects.filter(game=self).update(
+            final_score=F('score'),
+            date_finished=date_finished
+        )
+        game_players = self.get_gameplayers()
+        for game_player in game_players:
+            game_player.final_score = game_player.score
+            game_player.date_finished = date_finished
+        PlayerStats.record_game(game_players)
+        ScoreRollup.record_game(game_players, date_finished)
+
     def get_player_score(self, game_player):
         """Takes GamePlayer and returns int representing current score of Player.
 
         """
-        return Game.calculate_score(game_player.get_marks_list())
+        return game_player.score
 
     def get_current_player_score(self):
         """Returns current Player's current int score.
@@ -373,9 +1007,9 @@ class Game(models.Model):
 
         """
         player_scores = {}
-        for i, player in enumerate(self.players.all()):
+        for i, game_player in enumerate(self.get_gameplayers()):
             player_scores[i] = {
-                player.name: self.get_player_score(self.get_gameplayer(player))
+                game_player.player.name: self.get_player_score(game_player)
             }
         return player_scores
 
@@ -386,12 +1020,32 @@ class GamePlayer(models.Model):
     """
     player = models.ForeignKey(Player, on_delete=models.CASCADE)
     game = models.ForeignKey(Game, on_delete=models.CASCADE)
+    marks = models.BinaryField(max_length=11, default=b'')
+    score = models.IntegerField(default=0)
+    score_state = models.TextField(default='')
+    final_score = models.IntegerField(null=True, blank=True)
+    date_finished = models.DateTimeField(null=True, blank=True)
     date_created = models.DateTimeField(auto_now_add=True)
     date_updated = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'GamePlayer'
         verbose_name_plural = 'GamePlayers'
+        unique_together = ('player', 'game')
+        indexes = [
+            models.Index(
+                fields=['-final_score', '-id'],
+                name='bowling_gp_score_idx'
+            ),
+            models.Index(
+                fields=['player', '-final_score', '-id'],
+                name='bowling_gp_player_score_idx'
+            ),
+            models.Index(
+                fields=['date_finished'],
+                name='bowling_gp_finished_idx'
+            ),
+        ]
 
     def __str__(self):
         return '{}({})'.format(
@@ -399,6 +1053,30 @@ class GamePlayer(models.Model):
             self.game
         )
 
+    @staticmethod
+    def pack_marks(marks):
+        """Takes list of str marks and returns bytes holding one 4-bit MARK_CODE per mark.
+
+        """
+        codes = [MARK_CODES[mark] for mark in marks]
+        if len(codes) % 2:
+            codes.append(NO_MARK)
+        return bytes(
+            codes[i] << 4 | codes[i + 1] for i in range(0, len(codes), 2)
+        )
+
+    @staticmethod
+    def unpack_marks(data):
+        """Takes bytes from pack_marks and returns list of str marks.
+
+        """
+        marks = []
+        for byte in bytes(data):
+            for code in (byte >> 4, byte & 15):
+                if code != NO_MARK:
+                    marks.append(VALID_MARKS[code])
+        return marks
+
     def get_game_marks(self):
         """Returns PlayerGames for GamePlayer ordered by frame, chance.
 
@@ -409,14 +1087,51 @@ class GamePlayer(models.Model):
         return game_marks
 
     def get_marks_list(self):
-        """Returns PlayerGames for GamePlayer ordered by frame, chance as list of marks.
+        """Returns marks of GamePlayer in the order they were bowled.
 
+        Marks are decoded from the packed marks field; the PlayerGame rows are
+        only an audit log and are not read here.
         """
-        marks = []
-        game_marks = self.get_game_marks()
-        for game_mark in game_marks:
-            marks.append(game_mark.mark)
-        return marks
+        return GamePlayer.unpack_marks(self.marks)
+
+    def get_score_state(self):
+        """Returns dict representing the running score state of GamePlayer.
+
+        """
+        if not self.score_state:
+            return Game.new_score_state()
+        return json.loads(self.score_state)
+
+    def get_frame_scores(self):
+        """Returns list of int totals per frame, None where a bonus is still pending.
+
+        """
+        return self.get_score_state()['frames']
+
+    def add_mark(self, mark):
+        """Takes str mark and appends it to marks and the running score (does not save).
+
+        """
+        self.marks = GamePlayer.pack_marks(self.get_marks_list() + [mark])
+        score_state = Game.score_mark(self.get_score_state(), mark)
+        self.score_state = json.dumps(score_state)
+        self.score = Game.score_state_total(score_state)
+
+
+@receiver(post_delete, sender=Game)
+def clear_game_state(sender, instance, **kwargs):
+    """Drops the cached state of a deleted Game.
+
+    """
+    GAME_STATES.discard(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=GamePlayer)
+def discard_game_state(sender, instance, **kwargs):
+    """Drops the cached state of a Game when its roster or scores change.
+
+    """
+    GAME_STATES.discard(instance.game_id)
 
 
 class PlayerGame(models.Model):
@@ -433,6 +1148,16 @@ class PlayerGame(models.Model):
     class Meta:
         verbose_name = 'PlayerGame'
         verbose_name_plural = 'PlayerGame'
+        indexes = [
+            models.Index(
+                fields=['player', 'frame', 'chance'],
+                name='bowling_pg_player_frame_idx'
+            ),
+            models.Index(
+                fields=['date_created', 'id'],
+                name='bowling_pg_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return '{} - ({}/{}) - {}'.format(
@@ -441,3 +1166,306 @@ class PlayerGame(models.Model):
             self.chance,
             self.mark
         )
+
+
+class ScoreTotals(models.Model):
+    """ScoreTotals holds the counts of a set of finished Games, as kept by PlayerStats and ScoreRollup.
+
+    Counts are per GamePlayer, so a Game of four Players adds four games.
+    """
+    games = models.IntegerField(default=0)
+    total_score = models.IntegerField(default=0)
+    high_game = models.IntegerField(default=0)
+    strikes = models.IntegerField(default=0)
+    strike_chances = models.IntegerField(default=0)
+    spares = models.IntegerField(default=0)
+    spare_chances = models.IntegerField(default=0)
+    date_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    @staticmethod
+    def tally(marks, score):
+        """Takes list of str marks and int score of a finished game and returns dict of its counts.
+
+        Every ball thrown at a full rack is a strike chance; every first ball
+        that leaves pins standing is a spare chance.
+        """
+        counts = {
+            'games': 1,
+            'total_score': score,
+            'high_game': score,
+            'strikes': 0,
+            'strike_chances': 0,
+            'spares': 0,
+            'spare_chances': 0
+        }
+        full_rack = True
+        for mark in marks:
+            if full_rack:
+                counts['strike_chances'] += 1
+                if mark == 'x':
+                    counts['strikes'] += 1
+                else:
+                    full_rack = False
+            else:
+                counts['spare_chances'] += 1
+                if mark == '/':
+                    counts['spares'] += 1
+                full_rack = True
+        return counts
+
+    @staticmethod
+    def add(totals, counts):
+        """Takes dict totals and dict counts from tally and returns totals with counts added.
+
+        """
+        totals = dict(totals)
+        for field, value in counts.items():
+            if field == 'high_game':
+                totals[field] = max(totals.get(field, 0), value)
+            else:
+                totals[field] = totals.get(field, 0) + value
+        return totals
+
+    @classmethod
+    def add_counts(cls, rows):
+        """Takes list of (dict lookup, dict counts) and adds each counts to the row matching lookup.
+
+        Each row is updated in place with F() expressions, so concurrent
+        Games finishing don't lose counts. Rows that don't exist yet are
+        inserted together.
+        """
+        missing = [
+            (lookup, counts) for lookup, counts in rows
+            if not cls.update_counts(lookup, counts)
+        ]
+        if not missing:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create([
+                    cls(**lookup, **counts) for lookup, counts in missing
+                ])
+        except IntegrityError:
+            # Another Game created some of the rows meanwhile.
+            for lookup, counts in missing:
+                if not cls.update_counts(lookup, counts):
+                    cls.objects.create(**lookup, **counts)
+
+    @classmethod
+    def update_counts(cls, lookup, counts):
+        """Takes dict lookup and dict counts from tally, adds them to the matching row and returns bool of whether it existed.
+
+        """
+        changes = {
+            field: Greatest(F(field), value) if field == 'high_game' else F(field) + value
+            for field, value in counts.items()
+        }
+        return bool(cls.objects.filter(**lookup).update(
+            date_updated=timezone.now(),
+            **changes
+        ))
+
+    def get_counts(self):
+        """Returns dict of the counts, as tally does.
+
+        """
+        return {field: getattr(self, field) for field in TOTAL_FIELDS}
+
+    @property
+    def average(self):
+        return self.total_score / self.games if self.games else 0
+
+    @property
+    def strike_rate(self):
+        return self.strikes / self.strike_chances if self.strike_chances else 0
+
+    @property
+    def spare_rate(self):
+        return self.spares / self.spare_chances if self.spare_chances else 0
+
+    def totals_dict(self):
+        """Returns dict of the totals with average, strike and spare rates (0-1).
+
+        """
+        return {
+            'games': self.games,
+            'average': round(self.average, 2),
+            'high_game': self.high_game,
+            'strikes': self.strikes,
+            'strike_rate': round(self.strike_rate, 4),
+            'spares': self.spares,
+            'spare_rate': round(self.spare_rate, 4)
+        }
+
+
+class PlayerStats(ScoreTotals):
+    """PlayerStats holds a Player's career totals over finished Games.
+
+    A row is updated when each Game the Player bowled in finishes, so the
+    averages and rates are read with one primary key lookup. rebuild
+    recomputes rows from GamePlayer marks.
+    """
+    player = models.OneToOneField(
+        Player,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+
+    class Meta:
+        verbose_name = 'PlayerStats'
+        verbose_name_plural = 'PlayerStats'
+
+    def __str__(self):
+        return '{}'.format(
+            self.player_id
+        )
+
+    @staticmethod
+    def record_game(game_players):
+        """Takes GamePlayers of a Game that just finished and adds the Game to each Player's stats.
+
+        """
+        PlayerStats.add_counts([
+            (
+                {'player_id': game_player.player_id},
+                PlayerStats.tally(game_player.get_marks_list(), game_player.score)
+            )
+            for game_player in game_players
+        ])
+
+    @staticmethod
+    def rebuild(players=None, chunk_size=2000):
+        """Recomputes PlayerStats from finished Games and returns int number of rows written.
+
+        Takes an optional list of Player pks to limit the rebuild to.
+        GamePlayers are read with QuerySet.iterator, chunk_size at a time.
+        """
+        game_players = GamePlayer.objects.filter(game__status=-1)
+        stats = PlayerStats.objects.all()
+        if players is not None:
+            game_players = game_players.filter(player__in=players)
+            stats = stats.filter(player__in=players)
+        totals = {}
+        for player_id, marks, score in game_players.values_list(
+            'player_id', 'marks', 'score'
+        ).iterator(chunk_size=chunk_size):
+            totals[player_id] = PlayerStats.add(
+                totals.get(player_id, {}),
+                PlayerStats.tally(GamePlayer.unpack_marks(marks), score)
+            )
+        with transaction.atomic():
+            stats.delete()
+            PlayerStats.objects.bulk_create([
+                PlayerStats(player_id=player_id, **counts)
+                for player_id, counts in totals.items()
+            ], batch_size=chunk_size)
+        return len(totals)
+
+    def as_dict(self):
+        """Returns dict of the Player's totals with average, strike and spare rates (0-1).
+
+        """
+        return dict(self.totals_dict(), player=self.player_id)
+
+
+class ScoreRollup(ScoreTotals):
+    """ScoreRollup holds the totals of the Games finished in one day or week (starting Monday).
+
+    Both buckets are updated as each Game finishes; summarize answers any
+    range of days from the fewest buckets covering it.
+    """
+    period = models.CharField(max_length=4, choices=ROLLUP_PERIODS)
+    start = models.DateField()
+
+    class Meta:
+        verbose_name = 'ScoreRollup'
+        verbose_name_plural = 'ScoreRollups'
+        unique_together = ('period', 'start')
+
+    def __str__(self):
+        return '{} {}'.format(
+            self.period,
+            self.start
+        )
+
+    @staticmethod
+    def buckets(moment):
+        """Takes aware datetime and returns list of (str period, date start) of the buckets holding it.
+
+        Days are in the current time zone.
+        """
+        day = timezone.localdate(moment)
+        return [('day', day), ('week', day - datetime.timedelta(days=day.weekday()))]
+
+    @staticmethod
+    def cover(start, end):
+        """Takes dates start and end (inclusive) and returns tuple (list of day bucket starts, tuple (first, last) week bucket starts or None) covering them.
+
+        Whole weeks are read from week buckets, the at most 12 days around
+        them from day buckets. No date past end is computed, so ranges up to
+        date.max work.
+        """
+        span = (end - start).days
+        to_monday = -start.weekday() % 7
+        weeks = (span - to_monday + 1) // 7
+        if weeks <= 0:
+            return [start + datetime.timedelta(days=i) for i in range(span + 1)], None
+        first = start + datetime.timedelta(days=to_monday)
+        last = first + datetime.timedelta(days=7 * (weeks - 1))
+        days = [start + datetime.timedelta(days=i) for i in range(to_monday)]
+        days += [last + datetime.timedelta(days=7 + i) for i in range((end - last).days - 6)]
+        return days, (first, last)
+
+    @staticmethod
+    def record_game(game_players, date_finished):
+        """Takes GamePlayers of a Game that just finished and aware datetime date_finished and adds it to its buckets.
+
+        """
+        counts = {}
+        for game_player in game_players:
+            counts = ScoreRollup.add(
+                counts,
+                ScoreRollup.tally(game_player.get_marks_list(), game_player.score)
+            )
+        ScoreRollup.add_counts([
+            ({'period': period, 'start': start}, counts)
+            for period, start in ScoreRollup.buckets(date_finished)
+        ])
+
+    @staticmethod
+    def summarize(start, end):
+        """Takes dates start and end (inclusive) and returns an unsaved ScoreRollup of every Game finished in them.
+
+        """
+        days, weeks = ScoreRollup.cover(start, end)
+        lookup = models.Q(period='day', start__in=days)
+        if weeks is not None:
+            lookup |= models.Q(period='week', start__range=weeks)
+        totals = {field: 0 for field in TOTAL_FIELDS}
+        for rollup in ScoreRollup.objects.filter(lookup):
+            totals = ScoreRollup.add(totals, rollup.get_counts())
+        return ScoreRollup(start=start, **totals)
+
+    @staticmethod
+    def rebuild(chunk_size=2000):
+        """Recomputes every ScoreRollup from finished Games and returns int number of rows written.
+
+        """
+        totals = {}
+        for marks, score, date_finished in GamePlayer.objects.filter(
+            final_score__isnull=False
+        ).values_list('marks', 'score', 'date_finished').iterator(chunk_size=chunk_size):
+            counts = ScoreRollup.tally(GamePlayer.unpack_marks(marks), score)
+            for bucket in ScoreRollup.buckets(date_finished):
+                totals[bucket] = ScoreRollup.add(totals.get(bucket, {}), counts)
+        with transaction.atomic():
+            ScoreRollup.objects.all().delete()
+            ScoreRollup.objects.bulk_create([
+                ScoreRollup(period=period, start=start, **counts)
+                for (period, start), counts in totals.items()
+            ], batch_size=chunk_size)
+        return len(totals)
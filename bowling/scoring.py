@@ -0,0 +1,70 @@
+from bowling.models import MARK_CODES, MAX_MARKS, NO_MARK
+import numpy as np
+
+
+STRIKE = MARK_CODES['x']
+SPARE = MARK_CODES['/']
+CODE_TABLE = np.full(256, NO_MARK, dtype=np.int8)
+for mark, code in MARK_CODES.items():
+    CODE_TABLE[ord(mark)] = code
+
+
+def encode_marks(marks_lists):
+    """Takes list of lists of str marks and returns int8 matrix of roll codes padded to MAX_MARKS.
+
+    Marks are expected to be VALID_MARKS; anything else is read as NO_MARK.
+    """
+    text = ''.join(
+        ''.join(marks).ljust(MAX_MARKS) for marks in marks_lists
+    )
+    codes = CODE_TABLE[np.frombuffer(text.encode('ascii'), dtype=np.uint8)]
+    return codes.reshape(len(marks_lists), MAX_MARKS)
+
+
+def score_rolls(rolls):
+    """Takes matrix of roll codes (one game per row) and returns (final scores, frame scores).
+
+    Scores every row at once with the same rules as Game.calculate_score: the
+    loop walks frames (at most MAX_MARKS of them) while each step is applied to
+    all games together. Frame scores has one column per frame in the order
+    calculate_score visits them, with 0 where it adds nothing yet.
+    """
+    rolls = np.asarray(rolls)
+    games = rolls.shape[0]
+    width = MAX_MARKS + 2
+    padded = np.full((games, width), NO_MARK, dtype=np.int16)
+    padded[:, :rolls.shape[1]] = rolls
+    points = np.where(
+        padded == NO_MARK, 0, np.minimum(padded, 10)
+    ).astype(np.int16).ravel()
+    lengths = (padded != NO_MARK).sum(axis=1)
+    padded = padded.ravel()
+    x = np.arange(games) * width
+    last = x + lengths - 1
+    frames = np.zeros((games, MAX_MARKS), dtype=np.int16)
+    for frame in range(MAX_MARKS):
+        active = x < last
+        if not active.any():
+            break
+        has_bonus = x + 1 < last
+        strike = active & (padded[x] == STRIKE)
+        spare = active & ~strike & (padded[x + 1] == SPARE)
+        first = points[x]
+        second = points[x + 1]
+        third = points[x + 2]
+        score = np.where(
+            strike,
+            np.where(padded[x + 2] == SPARE, 20, 10 + second + third),
+            np.where(spare, 10 + third, first + second)
+        )
+        score[~active | ((strike | spare) & ~has_bonus)] = 0
+        frames[:, frame] = score
+        x += active.astype(np.int64) * 2 - strike
+    return frames.sum(axis=1), frames
+
+
+def score_marks(marks_lists):
+    """Takes list of lists of str marks and returns (final scores, frame scores).
+
+    """
+    return score_rolls(encode_marks(marks_lists))
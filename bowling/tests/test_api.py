@@ -1,9 +1,15 @@
-from django.test import TestCase
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from tastypie.test import ResourceTestCaseMixin
 from bowling.api.resources import GameManagerResource, PlayerResource, FrameResource, ChanceResource, GameResource, GamePlayerResource, PlayerGameResource
 from django.contrib.auth.models import User
-from bowling.models import Player, Game, PlayerGame
+from bowling.models import Player, Game, GamePlayer, PlayerGame
 from bowling.managers import GameManager
+from bowling.api.caching import FINISHED_GAMES, representation_tag
+from bowling.api.fieldsets import FieldsetResource
 
 
 class PlayerResourceTest(ResourceTestCaseMixin, TestCase):
@@ -86,6 +92,52 @@ class GameManagerResourceTest(ResourceTestCaseMixin, TestCase):
         # Verify a new one has been added.
         self.assertEqual(Game.objects.count(), 2)
 
+    def test_gamemanager_new_games(self):
+        resp = self.api_client.post(
+            '/api/v1/gamemanager/new_games/?username={}&api_key={}'.format(
+                self.user.username,
+                self.user.api_key
+            ),
+            format='json',
+            data={'games': [self.player_ids, self.player_ids[:1]]},
+            authentication=self.get_credentials()
+        )
+        self.assertHttpOK(resp)
+        self.assertEqual(len(self.deserialize(resp)['New Games']), 2)
+        self.assertEqual(Game.objects.count(), 3)
+
+    def test_gamemanager_new_games_missing_player(self):
+        self.assertHttpBadRequest(
+            self.api_client.get(
+                '/api/v1/gamemanager/new_games/?games={}&games=0&username={}&api_key={}'.format(
+                    self.user1.player.id,
+                    self.user.username,
+                    self.user.api_key
+                ),
+                authentication=self.get_credentials()
+            )
+        )
+        self.assertEqual(Game.objects.count(), 1)
+
+
+    def test_gamemanager_new_games_bad_body(self):
+        url = '/api/v1/gamemanager/new_games/'
+        for body in [
+            '{"games": ', '{"rosters": []}', '[]', '{"games": "8,10"}', '{"games": [[{}]]}',
+            '{"games": [[]]}', '{"games": [[1.5]]}', '{"games": [["a"]]}'
+        ]:
+            self.assertHttpBadRequest(
+                self.api_client.client.post(
+                    url,
+                    data=body,
+                    content_type='application/json',
+                    HTTP_AUTHORIZATION=self.get_credentials()
+                )
+            )
+        self.assertHttpMethodNotAllowed(
+            self.api_client.put(url, data={'games': []}, authentication=self.get_credentials())
+        )
+        self.assertEqual(Game.objects.count(), 1)
 
 class GameResourceTest(ResourceTestCaseMixin, TestCase):
     def setUp(self):
@@ -168,3 +220,395 @@ class GameResourceTest(ResourceTestCaseMixin, TestCase):
 class GameResourceTest(ResourceTestCaseMixin, TestCase):
     def setUp(self):
         super(GameManagerResourceTest, self).setUp()
+
+
+class GameBowlBatchResourceTest(ResourceTestCaseMixin, TestCase):
+    def setUp(self):
+        super(GameBowlBatchResourceTest, self).setUp()
+        self.username = 'testadmin'
+        self.password = 'testpass'
+        self.user = User.objects.create_superuser(self.username, 'test@example.com', self.password)
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.user2 = User.objects.create_user(
+            username='testuserb',
+            password='12345'
+        )
+        self.player_ids = [
+            self.user1.player.id,
+            self.user2.player.id
+        ]
+        self.game = GameManager().new_game(self.player_ids)
+        self.game.start()
+
+    def get_credentials(self):
+        return self.create_basic(username=self.username, password=self.password)
+
+    def test_game_bowl_batch(self):
+        resp = self.api_client.post(
+            '/api/v1/game/{}/bowl_batch/'.format(self.game.id),
+            format='json',
+            data={'marks': ['x', '3', '4', '5', '/']},
+            authentication=self.get_credentials()
+        )
+        self.assertHttpOK(resp)
+        state = self.deserialize(resp)['State']
+        self.assertEqual(state['frame'], 2)
+        self.assertEqual(state['chance'], 1)
+        self.assertEqual(PlayerGame.objects.count(), 5)
+
+    def test_game_etag(self):
+        for url in ['/api/v1/game/{}/', '/api/v1/game/{}/get_state/']:
+            url = url.format(self.game.id)
+            resp = self.api_client.get(url, authentication=self.get_credentials())
+            self.assertHttpOK(resp)
+            resp = self.api_client.get(
+                url,
+                authentication=self.get_credentials(),
+                HTTP_IF_NONE_MATCH=resp['ETag']
+            )
+            self.assertEqual(resp.status_code, 304)
+
+    def test_game_etag_unauthorized(self):
+        for url in ['/api/v1/game/{}/', '/api/v1/game/{}/get_state/']:
+            url = url.format(self.game.id)
+            etag = self.api_client.get(url, authentication=self.get_credentials())['ETag']
+            resp = self.api_client.get(
+                url,
+                authentication=self.create_basic(username='testusera', password='12345'),
+                HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertHttpUnauthorized(resp)
+
+    def test_game_etag_representation(self):
+        url = '/api/v1/game/{}/'.format(self.game.id)
+        full = self.api_client.get(url, authentication=self.get_credentials())
+        self.assertIn('Accept', full['Vary'])
+        resp = self.api_client.get(
+            url + '?fields=status',
+            authentication=self.get_credentials(),
+            HTTP_IF_NONE_MATCH=full['ETag']
+        )
+        self.assertHttpOK(resp)
+        self.assertNotEqual(resp['ETag'], full['ETag'])
+        self.assertEqual(set(self.deserialize(resp)), {'status', 'resource_uri'})
+        request = RequestFactory().get(url)
+        self.assertNotEqual(
+            representation_tag(request, 'application/json'),
+            representation_tag(request, 'application/xml')
+        )
+
+    def test_contention(self):
+        resp = self.api_client.get('/api/v1/game/contention/', authentication=self.get_credentials())
+        self.assertHttpOK(resp)
+        self.assertIn('writes', self.deserialize(resp)['Contention'])
+        self.assertHttpUnauthorized(
+            self.api_client.get(
+                '/api/v1/game/contention/',
+                authentication=self.create_basic(username='testusera', password='12345')
+            )
+        )
+
+    def test_game_bowl_batch_invalid(self):
+        resp = self.api_client.get(
+            '/api/v1/game/{}/bowl_batch/?marks=x,3,12'.format(self.game.id),
+            authentication=self.get_credentials()
+        )
+        self.assertHttpOK(resp)
+        self.assertEqual(self.deserialize(resp)['Bowls Entered'], 'Invalid Mark!')
+        self.assertEqual(PlayerGame.objects.count(), 0)
+
+
+    def test_game_bowl_batch_bad_body(self):
+        url = '/api/v1/game/{}/bowl_batch/'.format(self.game.id)
+        for body in ['{"marks": ', '{"mark": "x"}', '{"marks": "x73"}', '{"marks": ["x", 7]}']:
+            self.assertHttpBadRequest(
+                self.api_client.client.post(
+                    url,
+                    data=body,
+                    content_type='application/json',
+                    HTTP_AUTHORIZATION=self.get_credentials()
+                )
+            )
+        self.assertHttpMethodNotAllowed(
+            self.api_client.put(url, data={'marks': ['x']}, authentication=self.get_credentials())
+        )
+        self.assertEqual(PlayerGame.objects.count(), 0)
+
+class GameFieldsetResourceTest(ResourceTestCaseMixin, TestCase):
+    def setUp(self):
+        super(GameFieldsetResourceTest, self).setUp()
+        self.username = 'testadmin'
+        self.password = 'testpass'
+        self.user = User.objects.create_superuser(self.username, 'test@example.com', self.password)
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.user2 = User.objects.create_user(
+            username='testuserb',
+            password='12345'
+        )
+        self.player_ids = [
+            self.user1.player.id,
+            self.user2.player.id
+        ]
+        self.game = GameManager().new_game(self.player_ids)
+
+    def get_credentials(self):
+        return self.create_basic(username=self.username, password=self.password)
+
+    def get_games(self, query=''):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.api_client.get(
+                '/api/v1/game/{}'.format(query),
+                format='json',
+                authentication=self.get_credentials()
+            )
+        self.assertHttpOK(resp)
+        return self.deserialize(resp)['objects'], len(queries)
+
+    def test_game_fields(self):
+        games, _ = self.get_games('?fields=status,players')
+        self.assertEqual(set(games[0].keys()), {'status', 'players', 'resource_uri'})
+        self.assertEqual(games[0]['players'][0]['user']['username'], 'testusera')
+
+    def test_game_depth(self):
+        games, _ = self.get_games('?depth=0')
+        self.assertEqual(games[0]['players'][0], '/api/v1/player/{}/'.format(self.player_ids[0]))
+        games, _ = self.get_games('?full=0')
+        self.assertEqual(games[0]['players'][1], '/api/v1/player/{}/'.format(self.player_ids[1]))
+        games, _ = self.get_games('?depth=1')
+        self.assertEqual(games[0]['players'][0]['user'], '/api/v1/user/{}/'.format(self.user1.id))
+        games, _ = self.get_games()
+        self.assertEqual(games[0]['players'][0]['user']['username'], 'testusera')
+
+    def test_game_related_paths_bounded(self):
+        self.get_games('?fields=status,players')
+        self.get_games('?depth=100')
+        cached = len(FieldsetResource._related_paths)
+        for x in range(20):
+            self.get_games('?fields=status,players,made{}&depth={}'.format(x, 100 + x))
+        self.assertEqual(len(FieldsetResource._related_paths), cached)
+
+    def test_game_list_queries(self):
+        _, one_game = self.get_games()
+        GameManager().new_game(self.player_ids)
+        GameManager().new_game(self.player_ids)
+        _, three_games = self.get_games()
+        self.assertEqual(one_game, three_games)
+
+
+class FinishedGameResourceTest(ResourceTestCaseMixin, TestCase):
+    def setUp(self):
+        super(FinishedGameResourceTest, self).setUp()
+        FINISHED_GAMES.clear()
+        self.username = 'testadmin'
+        self.password = 'testpass'
+        self.user = User.objects.create_superuser(self.username, 'test@example.com', self.password)
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.game = GameManager().new_game([self.user1.player.id])
+        self.game.start()
+        self.game.bowl_many(['x'] * 12)
+
+    def get_credentials(self):
+        return self.create_apikey(self.username, self.user.api_key.key)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.api_client.get(url, authentication=self.get_credentials())
+        self.assertHttpOK(resp)
+        return resp, len(queries)
+
+    def test_finished_game_cached(self):
+        for url in [
+            '/api/v1/game/{}/',
+            '/api/v1/game/{}/get_state/',
+            '/api/v1/playergame/?player__game={}'
+        ]:
+            url = url.format(self.game.id)
+            first, first_queries = self.get(url)
+            second, second_queries = self.get(url)
+            self.assertEqual(first.content, second.content)
+            self.assertNotIn('no-cache', second['Cache-Control'])
+            self.assertNotIn('immutable', second['Cache-Control'])
+            self.assertIn('max-age=60', second['Cache-Control'])
+            self.assertEqual(first['ETag'], second['ETag'])
+            self.assertLessEqual(second_queries, first_queries)
+        self.assertEqual(len(self.deserialize(second)['objects']), 12)
+
+    def test_finished_game_edit(self):
+        url = '/api/v1/game/{}/'.format(self.game.id)
+        first, _ = self.get(url)
+        self.game.current_frame = 5
+        self.game.save()
+        second, _ = self.get(url)
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(self.deserialize(second)['current_frame'], 5)
+
+    def test_finished_game_player_edit(self):
+        for url in ['/api/v1/game/{}/', '/api/v1/game/{}/get_state/']:
+            url = url.format(self.game.id)
+            first, _ = self.get(url)
+            self.user1.player.name = 'renam'
+            self.user1.player.save()
+            second, _ = self.get(url)
+            self.assertNotEqual(first['ETag'], second['ETag'])
+            self.assertIn('renam', second.content.decode('utf-8'))
+            self.user1.player.name = 'testa'
+            self.user1.player.save()
+
+    def test_finished_game_edit_elsewhere(self):
+        # Another process edits a roll: this process gets no signal.
+        url = '/api/v1/playergame/?player__game={}'.format(self.game.id)
+        first, _ = self.get(url)
+        PlayerGame.objects.filter(player__game=self.game).update(mark='9', date_updated=timezone.now())
+        second, _ = self.get(url)
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(self.deserialize(second)['objects'][0]['mark'], '9')
+
+    def test_finished_game_unauthorized_list(self):
+        url = '/api/v1/playergame/?player__game={}'.format(self.game.id)
+        self.get(url)
+        resp = self.api_client.get(url, authentication=self.create_apikey(
+            'testusera', self.user1.api_key.key
+        ))
+        self.assertHttpOK(resp)
+        self.assertEqual(self.deserialize(resp)['objects'], [])
+
+    def test_active_game_not_cached(self):
+        game = GameManager().new_game([self.user1.player.id])
+        resp, _ = self.get('/api/v1/game/{}/'.format(game.id))
+        self.assertNotIn('max-age', resp['Cache-Control'])
+
+    def test_eviction(self):
+        with self.settings(BOWLING_FINISHED_CACHE_BYTES=10):
+            FINISHED_GAMES.store((1, 'a', 'json', ()), 1, HttpResponse(b'123456'))
+            FINISHED_GAMES.store((2, 'a', 'json', ()), 1, HttpResponse(b'123456'))
+            self.assertIsNone(FINISHED_GAMES.get((1, 'a', 'json', ()), 1))
+            self.assertIsNotNone(FINISHED_GAMES.get((2, 'a', 'json', ()), 1))
+            self.assertIsNone(FINISHED_GAMES.get((2, 'a', 'json', ()), 2))
+
+
+class KeysetPaginationTest(ResourceTestCaseMixin, TestCase):
+    def setUp(self):
+        super(KeysetPaginationTest, self).setUp()
+        self.username = 'testadmin'
+        self.password = 'testpass'
+        self.user = User.objects.create_superuser(self.username, 'test@example.com', self.password)
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.games = [GameManager().new_game([self.user1.player.id]) for x in range(5)]
+
+    def get_credentials(self):
+        return self.create_apikey(self.username, self.user.api_key.key)
+
+    def get_pages(self, url):
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.api_client.get(url, authentication=self.get_credentials())
+            self.assertHttpOK(resp)
+            self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+            data = self.deserialize(resp)
+            ids += [game['id'] for game in data['objects']]
+            url = data['meta']['next']
+        return ids
+
+    def test_game_pages(self):
+        ids = [game.id for game in self.games]
+        self.assertEqual(self.get_pages('/api/v1/game/?limit=2'), ids)
+        self.assertEqual(self.get_pages('/api/v1/game/?limit=2&order_by=-date_created'), ids[::-1])
+
+    def test_game_offset(self):
+        resp = self.api_client.get(
+            '/api/v1/game/?limit=2&offset=2',
+            authentication=self.get_credentials()
+        )
+        self.assertEqual(self.deserialize(resp)['meta']['total_count'], 5)
+
+    def test_game_invalid_cursor(self):
+        self.assertHttpBadRequest(
+            self.api_client.get(
+                '/api/v1/game/?cursor=abc',
+                authentication=self.get_credentials()
+            )
+        )
+
+
+class LeaderboardResourceTest(ResourceTestCaseMixin, TestCase):
+    def setUp(self):
+        super(LeaderboardResourceTest, self).setUp()
+        self.user = User.objects.create_superuser('testadmin', 'test@example.com', 'testpass')
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.user2 = User.objects.create_user(
+            username='testuserb',
+            password='12345'
+        )
+        self.user1.player.name = 'testa'
+        self.user1.player.save()
+        self.player1 = self.user1.player
+        self.player2 = self.user2.player
+        for players, marks in [
+            ([self.player1, self.player2], ['x', '3', '4'] * 9 + ['x', 'x', 'x', '3', '4']),
+            ([self.player1], ['5', '4'] * 10),
+            ([self.player2], ['x'] * 12),
+            ([self.player1], ['x'] * 3),
+        ]:
+            game = GameManager.new_game([player.id for player in players])
+            game.start()
+            game.bowl_many(marks)
+
+    def get_pages(self, url):
+        rows = []
+        while url:
+            resp = self.api_client.get(url, authentication=self.create_apikey(
+                'testadmin', self.user.api_key.key
+            ))
+            self.assertHttpOK(resp)
+            data = self.deserialize(resp)
+            rows += [(row['player_name'], row['final_score']) for row in data['objects']]
+            url = data['meta']['next']
+        return rows
+
+    def test_final_score_stored(self):
+        self.assertEqual(
+            sorted(Game.objects.get(id=game_id).status for game_id in GamePlayer.objects.filter(
+                final_score__isnull=False
+            ).values_list('game_id', flat=True)),
+            [-1] * 4
+        )
+
+    def test_leaderboard(self):
+        name2 = self.player2.name
+        self.assertEqual(
+            self.get_pages('/api/v1/leaderboard/?limit=1'),
+            [(name2, 300), ('testa', 300), ('testa', 90), (name2, 70)]
+        )
+        self.assertEqual(
+            self.get_pages('/api/v1/leaderboard/?limit=2&best=1'),
+            [(name2, 300), ('testa', 300)]
+        )
+        self.assertEqual(
+            self.get_pages('/api/v1/leaderboard/?player={}'.format(self.player1.id)),
+            [('testa', 300), ('testa', 90)]
+        )
+
+    def test_leaderboard_dates(self):
+        GamePlayer.objects.filter(player=self.player2, final_score=300).update(
+            date_finished='2018-01-01T00:00:00Z'
+        )
+        self.assertEqual(
+            self.get_pages('/api/v1/leaderboard/?best=1&date_finished__gte=2018-06-01'),
+            [('testa', 300), (self.player2.name, 70)]
+        )
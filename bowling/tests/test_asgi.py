@@ -0,0 +1,128 @@
+from django.test import TransactionTestCase
+from tastypie.test import ResourceTestCaseMixin
+from django.contrib.auth.models import User
+from bowling.asgi import LaneApplication, build_environ
+from bowling.managers import GameManager
+from bowling.events import EVENTS
+import asyncio
+import json
+
+
+class LaneApplicationTest(ResourceTestCaseMixin, TransactionTestCase):
+    # The lane views run on LANE_EXECUTOR threads, which only see committed rows.
+
+    def setUp(self):
+        super(LaneApplicationTest, self).setUp()
+        EVENTS.clear()
+        self.user = User.objects.create_superuser('testadmin', 'test@example.com', 'testpass')
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.user1.player.name = 'testa'
+        self.user1.player.save()
+        self.game = GameManager.new_game([self.user1.player.id])
+        self.game.start()
+        self.fallback_scopes = []
+        self.application = LaneApplication(self.fallback)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        super(LaneApplicationTest, self).tearDown()
+
+    def fallback(self, scope):
+        self.fallback_scopes.append(scope)
+        return None
+
+    def get_headers(self):
+        return [
+            (b'host', b'localhost'),
+            (b'authorization', self.create_apikey('testadmin', self.user.api_key.key).encode('latin1'))
+        ]
+
+    def request(self, path, headers, until=None):
+        """Takes str path, list of headers and optional coroutine function until and returns list of messages sent.
+
+        until is awaited once the response has started, with the messages so
+        far; the client disconnects when it returns.
+        """
+        sent = []
+        started = self.loop.create_future()
+        disconnected = self.loop.create_future()
+        messages = [{'type': 'http.request', 'body': b''}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await disconnected
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if not started.done():
+                started.set_result(None)
+
+        async def run():
+            instance = self.loop.create_task(self.application({
+                'type': 'http',
+                'method': 'GET',
+                'path': path,
+                'query_string': b'',
+                'headers': headers
+            })(receive, send))
+            if until is not None:
+                await started
+                await until(sent)
+                disconnected.set_result(None)
+            await instance
+
+        self.loop.run_until_complete(asyncio.wait_for(run(), 10, loop=self.loop))
+        return sent
+
+    def test_build_environ(self):
+        environ = build_environ({
+            'type': 'http',
+            'method': 'POST',
+            'path': '/bowling/game/1/bowl/',
+            'query_string': b'mark=7',
+            'headers': [(b'content-type', b'text/plain'), (b'last-event-id', b'4')]
+        }, b'body')
+        self.assertEqual(environ['QUERY_STRING'], 'mark=7')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_LAST_EVENT_ID'], '4')
+        self.assertEqual(environ['wsgi.input'].read(), b'body')
+
+    def test_fallback(self):
+        self.assertIsNone(self.application({'type': 'http', 'path': '/api/v1/game/1/'}))
+        self.assertIsNone(self.application({'type': 'lifespan'}))
+        self.assertEqual(len(self.fallback_scopes), 2)
+
+    def test_get_state(self):
+        self.game.bowl('7')
+        path = '/bowling/game/{}/get_state/'.format(self.game.id)
+        sent = self.request(path, self.get_headers())
+        self.assertEqual(sent[0]['status'], 200)
+        wsgi = self.api_client.get(path, authentication=self.create_apikey(
+            'testadmin', self.user.api_key.key
+        ))
+        self.assertEqual(json.loads(sent[1]['body'].decode('utf-8')), self.deserialize(wsgi))
+
+    def test_unauthorized(self):
+        sent = self.request('/bowling/game/{}/get_state/'.format(self.game.id), [(b'host', b'localhost')])
+        self.assertEqual(sent[0]['status'], 401)
+
+    def test_events(self):
+        async def bowl(sent):
+            while len(sent) < 4:
+                await asyncio.sleep(0.01, loop=self.loop)
+            await self.loop.run_in_executor(None, self.game.bowl, '7')
+            while len(sent) < 5:
+                await asyncio.sleep(0.01, loop=self.loop)
+
+        sent = self.request('/bowling/game/{}/events/'.format(self.game.id), self.get_headers(), bowl)
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        self.assertTrue(sent[2]['body'].startswith(b'retry: '))
+        events = [message['body'].decode('utf-8').split('\n')[1] for message in sent[3:]]
+        self.assertEqual(events, ['event: state', 'event: bowl'])
@@ -0,0 +1,149 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+from bowling.audit import audit_range, game_ranges, replay_game
+from bowling.managers import GameManager
+from bowling.models import CHANCES, FRAMES, Game, GamePlayer, PlayerGame
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+
+class RescoreTest(TestCase):
+    def setUp(self):
+        super(RescoreTest, self).setUp()
+        self.player1 = User.objects.create_user(username='testusera', password='12345').player
+        self.player2 = User.objects.create_user(username='testuserb', password='12345').player
+
+    def play(self, marks):
+        game = GameManager.new_game([self.player1.id, self.player2.id])
+        game.start()
+        game.bowl_many(marks)
+        return game
+
+    def finished_game(self):
+        # testusera bowls a perfect game and testuserb nines in every frame.
+        marks = []
+        for frame in range(9):
+            marks += ['x', '9', '0']
+        return self.play(marks + ['x', 'x', 'x', '9', '0'])
+
+    def snapshot(self, game):
+        return (
+            list(Game.objects.filter(pk=game.pk).values_list(
+                'current_frame', 'current_chance', 'current_player_index', 'status'
+            )),
+            [
+                (bytes(marks), score, json.loads(score_state), final_score)
+                for marks, score, score_state, final_score in GamePlayer.objects.filter(
+                    game=game
+                ).order_by('id').values_list('marks', 'score', 'score_state', 'final_score')
+            ]
+        )
+
+    def corrupt(self, game):
+        Game.objects.filter(pk=game.pk).update(current_frame=4, current_chance=2, status=1)
+        GamePlayer.objects.filter(game=game).update(score=7, final_score=None)
+
+    def test_game_ranges(self):
+        self.assertEqual(list(game_ranges(3, 10, 4)), [(3, 7), (7, 11)])
+
+    def test_consistent_games(self):
+        games = [self.finished_game(), self.play(['x', '7', '/', '3'])]
+        result = audit_range(games[0].pk, games[1].pk + 1)
+        self.assertEqual((result['games'], result['corrected'], result['issues']), (2, 0, []))
+
+    def test_corrections(self):
+        game = self.finished_game()
+        expected = self.snapshot(game)
+        self.assertEqual([scores[3] for scores in expected[1]], [300, 90])
+        version = Game.get_version(game.pk)
+        self.corrupt(game)
+        result = audit_range(game.pk, game.pk + 1)
+        self.assertEqual((result['corrected'], result['finished_changed']), (1, 2))
+        self.assertEqual(self.snapshot(game), expected)
+        self.assertEqual(Game.get_version(game.pk), version + 1)
+        self.assertEqual(Game.get_cached_state(game.pk)[1], -1)
+
+    def test_dry_run(self):
+        game = self.finished_game()
+        self.corrupt(game)
+        corrupted = self.snapshot(game)
+        result = audit_range(game.pk, game.pk + 1, fix=False)
+        self.assertEqual(result['corrected'], 1)
+        self.assertEqual(self.snapshot(game), corrupted)
+
+    def test_bowled_during_audit(self):
+        game = self.play(['x', '7', '/'])
+        self.corrupt(game)
+        corrupted = self.snapshot(game)
+
+        def replay_while_bowling(*args):
+            # A roll commits after the audit read the game.
+            Game.objects.filter(pk=game.pk).update(version=F('version') + 1)
+            return replay_game(*args)
+
+        with mock.patch('bowling.audit.replay_game', side_effect=replay_while_bowling):
+            result = audit_range(game.pk, game.pk + 1)
+        self.assertEqual(result['corrected'], 0)
+        self.assertEqual(result['issues'], [(game.pk, 'Bowled while being audited, skipped.')])
+        self.assertEqual(self.snapshot(game), corrupted)
+
+    def test_replay_packed_marks(self):
+        with self.settings(BOWLING_RECORD_ROLLS=False):
+            game = self.play(['x', '7', '/', '3', '4'])
+        expected = self.snapshot(game)
+        self.assertEqual(expected[0], [(2, 1, 1, 1)])
+        self.corrupt(game)
+        audit_range(game.pk, game.pk + 1)
+        self.assertEqual(self.snapshot(game), expected)
+
+    def test_incomplete_log(self):
+        game = self.play(['x', '7', '/'])
+        PlayerGame.objects.filter(player__game=game, mark='/').delete()
+        result = audit_range(game.pk, game.pk + 1)
+        self.assertEqual(result['corrected'], 0)
+        self.assertEqual(result['issues'], [(game.pk, 'Roll log is incomplete, replaying the packed marks.')])
+
+    def test_invalid_mark_in_log(self):
+        game = self.play(['x', '7', '/'])
+        game_player = GamePlayer.objects.filter(game=game).order_by('id').first()
+        PlayerGame.objects.create(player=game_player, frame=FRAMES.get(2), chance=CHANCES.get(1), mark='X')
+        expected = self.snapshot(game)
+        result = audit_range(game.pk, game.pk + 1)
+        self.assertEqual(result['corrected'], 0)
+        self.assertEqual(result['issues'], [(game.pk, "Roll 'X' is not a valid mark, skipped.")])
+        self.assertEqual(self.snapshot(game), expected)
+
+    def test_roll_out_of_turn(self):
+        game = self.play(['x', '7'])
+        PlayerGame.objects.filter(player__game=game, mark='7').update(frame=FRAMES.get(2))
+        result = audit_range(game.pk, game.pk + 1)
+        self.assertEqual(result['issues'], [(game.pk, 'Roll 7 logged as frame 2 chance 1 out of turn.')])
+
+    def test_command_resumes_from_checkpoint(self):
+        games = [self.finished_game() for x in range(3)]
+        expected = self.snapshot(games[2])
+        for game in games:
+            self.corrupt(game)
+        skipped = self.snapshot(games[0])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'rescore.json')
+            with open(path, 'w') as checkpoint:
+                json.dump({
+                    'next': games[2].pk,
+                    'end': games[2].pk,
+                    'totals': {'games': 2, 'corrected': 2, 'finished_changed': 4, 'issues': 0}
+                }, checkpoint)
+            output = io.StringIO()
+            call_command('rescore_games', checkpoint=path, chunk_size=1, workers=1, stdout=output)
+            self.assertFalse(os.path.exists(path))
+        lines = output.getvalue().strip().split('\n')
+        self.assertEqual(lines[0], 'Resuming from game {}.'.format(games[2].pk))
+        self.assertTrue(lines[1].startswith('Games {0}-{0}: 1 audited, 1 corrected'.format(games[2].pk)))
+        self.assertEqual(lines[2], 'Rescored 3 games, 3 corrected, 0 issues.')
+        self.assertEqual(self.snapshot(games[2]), expected)
+        self.assertEqual(self.snapshot(games[0]), skipped)
@@ -0,0 +1,62 @@
+from django.contrib.auth.models import User, Permission
+from django.test import TestCase
+from tastypie.test import ResourceTestCaseMixin
+from bowling.api.authentication import CREDENTIALS
+from bowling.managers import GameManager
+
+
+class CachedApiKeyAuthenticationTest(ResourceTestCaseMixin, TestCase):
+    def setUp(self):
+        super(CachedApiKeyAuthenticationTest, self).setUp()
+        CREDENTIALS.clear()
+        self.user = User.objects.create_user(
+            username='testlane',
+            password='12345'
+        )
+        self.user.user_permissions.add(Permission.objects.get(codename='change_game'))
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.game = GameManager.new_game([self.user1.player.id])
+        self.game.start()
+        self.url = '/bowling/game/{}/get_state/'.format(self.game.id)
+
+    def get(self, key=None):
+        return self.api_client.get(
+            self.url,
+            authentication=self.create_apikey('testlane', key or self.user.api_key.key)
+        )
+
+    def test_cached_lane_request(self):
+        self.assertHttpOK(self.get())
+        # Only the game's version is read, to check the cached state.
+        with self.assertNumQueries(1):
+            self.assertHttpOK(self.get())
+
+    def test_cached_api_state(self):
+        self.url = '/api/v1/game/{}/get_state/'.format(self.game.id)
+        etag = self.get()['ETag']
+        # Only the game's version and status are read; the state is cached.
+        with self.assertNumQueries(1):
+            self.assertHttpOK(self.get())
+        with self.assertNumQueries(1):
+            resp = self.api_client.get(
+                self.url,
+                authentication=self.create_apikey('testlane', self.user.api_key.key),
+                HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(resp.status_code, 304)
+
+    def test_key_change(self):
+        old_key = self.user.api_key.key
+        self.assertHttpOK(self.get(old_key))
+        self.user.api_key.key = self.user.api_key.generate_key()
+        self.user.api_key.save()
+        self.assertHttpUnauthorized(self.get(old_key))
+        self.assertHttpOK(self.get(self.user.api_key.key))
+
+    def test_permission_change(self):
+        self.assertHttpOK(self.get())
+        self.user.user_permissions.clear()
+        self.assertHttpUnauthorized(self.get())
@@ -0,0 +1,55 @@
+from django.test import TestCase
+from unittest import mock
+from bowling.models import Game, PlayerGame, GAME_CONTENTION
+from bowling.managers import GameManager
+from django.contrib.auth.models import User
+
+
+class GameConcurrencyTest(TestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.user2 = User.objects.create_user(
+            username='testuserb',
+            password='12345'
+        )
+        self.game = GameManager.new_game([
+            self.user1.player.id,
+            self.user2.player.id
+        ])
+        self.game.start()
+        GAME_CONTENTION.reset()
+
+    def test_version_increments(self):
+        version = self.game.version
+        self.game.bowl('3')
+        self.assertEqual(self.game.version, version + 1)
+        self.assertEqual(Game.objects.get(id=self.game.id).version, version + 1)
+
+    def test_stale_bowl_retries(self):
+        terminal_a = Game.objects.get(id=self.game.id)
+        terminal_b = Game.objects.get(id=self.game.id)
+        terminal_b.get_state()
+        terminal_a.bowl('3')
+        terminal_b.bowl('4')
+
+        game = Game.objects.get(id=self.game.id)
+        self.assertEqual(game.current_player_index, 1)
+        self.assertEqual(
+            game.get_gameplayer(self.user1.player).get_marks_list(),
+            ['3', '4']
+        )
+        self.assertEqual(PlayerGame.objects.count(), 2)
+        self.assertEqual(
+            GAME_CONTENTION.as_dict(),
+            {'writes': 2, 'conflicts': 1, 'retried_writes': 1, 'failures': 0}
+        )
+
+    def test_conflicts_exhausted(self):
+        with mock.patch.object(Game, 'save_state', return_value=False):
+            self.assertEqual(self.game.bowl('3'), 'Game is Busy!')
+        self.assertEqual(PlayerGame.objects.count(), 0)
+        self.assertEqual(GAME_CONTENTION.failures, 1)
+        self.assertEqual(GAME_CONTENTION.conflicts, 3)
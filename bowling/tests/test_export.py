@@ -0,0 +1,82 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from tastypie.test import ResourceTestCaseMixin
+from bowling.export import export_lines, parse_filters
+from bowling.managers import GameManager
+from bowling.models import Game
+import datetime
+import io
+import json
+
+
+class ExportTest(ResourceTestCaseMixin, TestCase):
+    def setUp(self):
+        super(ExportTest, self).setUp()
+        self.user = User.objects.create_superuser('testadmin', 'test@example.com', 'testpass')
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.user2 = User.objects.create_user(
+            username='testuserb',
+            password='12345'
+        )
+        self.game1 = GameManager.new_game([self.user1.player.id, self.user2.player.id])
+        self.game1.start()
+        self.game1.bowl_many(['x', '3', '4'])
+        self.game2 = GameManager.new_game([self.user2.player.id])
+        Game.objects.filter(id=self.game2.id).update(
+            date_created=timezone.now() + datetime.timedelta(days=2)
+        )
+
+    def test_export_lines(self):
+        records = [json.loads(line) for line in export_lines(chunk_size=1)]
+        self.assertEqual([record['id'] for record in records], [self.game1.id, self.game2.id])
+        self.assertEqual(
+            [(player['player'], player['marks'], player['score']) for player in records[0]['roster']],
+            [(self.user1.player.id, ['x'], 0), (self.user2.player.id, ['3', '4'], 7)]
+        )
+
+    def test_export_filters(self):
+        tomorrow = (timezone.now() + datetime.timedelta(days=1)).date().isoformat()
+        lines = list(export_lines(**parse_filters({'end': tomorrow})))
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.game1.id])
+        lines = list(export_lines(**parse_filters({'start': tomorrow})))
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.game2.id])
+        lines = list(export_lines(**parse_filters({'player': str(self.user1.player.id)})))
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.game1.id])
+        with self.assertRaises(ValueError):
+            parse_filters({'start': 'yesterday'})
+
+    def test_export_command(self):
+        output = io.StringIO()
+        call_command('export_games', player=str(self.user2.player.id), stdout=output)
+        self.assertEqual(len(output.getvalue().splitlines()), 2)
+
+    def test_export_endpoint(self):
+        resp = self.api_client.get(
+            '/api/v1/game/export/?player={}'.format(self.user1.player.id),
+            authentication=self.create_apikey('testadmin', self.user.api_key.key)
+        )
+        self.assertHttpOK(resp)
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(resp.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.game1.id])
+
+    def test_export_endpoint_bad_filter(self):
+        self.assertHttpBadRequest(
+            self.api_client.get(
+                '/api/v1/game/export/?start=yesterday',
+                authentication=self.create_apikey('testadmin', self.user.api_key.key)
+            )
+        )
+
+    def test_export_endpoint_unauthorized(self):
+        self.assertHttpUnauthorized(
+            self.api_client.get(
+                '/api/v1/game/export/',
+                authentication=self.create_apikey('testusera', self.user1.api_key.key)
+            )
+        )
@@ -1,5 +1,5 @@
 from django.test import TestCase
-from bowling.models import Game
+from bowling.models import Game, GamePlayer
 
 
 class GameTests(TestCase):
@@ -56,3 +56,65 @@ class GameTests(TestCase):
         self.assertEqual(Game.calculate_score(all_spares), 190)
         self.assertEqual(Game.calculate_score(random_marks), 89)
         self.assertEqual(Game.calculate_score(all_strikes_but_one), 270)
+
+    def test_score_mark(self):
+        """
+        score_mark() keeps a running score equal to calculate_score()
+        after every mark.
+        """
+
+        vectors = [
+            ['5', '3', '1'],
+            ['5', '3', '6', '/', '3', '/', '6', '0', 'x', '6', '/', '0', '/', '6'],
+            ['x', 'x', 'x', 'x', 'x', 'x', 'x', 'x', 'x', 'x', 'x', 'x'],
+            ['9', '/', '9', '/', '9', '/', '9', '/', '9', '/', '9', '/', '9', '/', '9', '/', '9', '/', '9', '/', '9'],
+            ['x', '3', '/', 'x', 'x', '0', '0', 'x', '1', '/', '7']
+        ]
+
+        for marks in vectors:
+            score_state = Game.new_score_state()
+            for i, mark in enumerate(marks):
+                score_state = Game.score_mark(score_state, mark)
+                self.assertEqual(
+                    Game.score_state_total(score_state),
+                    Game.calculate_score(marks[:i + 1])
+                )
+
+    def test_score_mark_frames(self):
+        """
+        score_mark() leaves frames with pending bonuses unresolved.
+        """
+
+        score_state = Game.new_score_state()
+        for mark in ['x', '3', '/', '4']:
+            score_state = Game.score_mark(score_state, mark)
+        self.assertEqual(score_state['frames'], [20, 14])
+        self.assertEqual(score_state['open'], '4')
+
+        score_state = Game.score_mark(score_state, '/')
+        self.assertEqual(score_state['frames'], [20, 14, None])
+
+    def test_pack_marks(self):
+        """
+        pack_marks() stores marks as 4-bit codes that unpack_marks() reads back.
+        """
+
+        marks = ['x', '9', '/', '0', 'x', 'x', '3']
+        packed = GamePlayer.pack_marks(marks)
+        self.assertEqual(len(packed), 4)
+        self.assertEqual(GamePlayer.unpack_marks(packed), marks)
+        self.assertEqual(len(GamePlayer.pack_marks(['x'] * 21)), 11)
+        self.assertEqual(GamePlayer.unpack_marks(b''), [])
+
+    def test_transition(self):
+        """
+        transition() returns the next (frame, chance, player_index, status).
+        """
+
+        self.assertEqual(Game.transition(1, 1, 0, 1, 2, '3'), (1, 2, 0, 1))
+        self.assertEqual(Game.transition(1, 1, 0, 1, 2, 'x'), (1, 1, 1, 1))
+        self.assertEqual(Game.transition(1, 2, 1, 1, 2, '/'), (2, 1, 0, 1))
+        self.assertEqual(Game.transition(10, 2, 0, 1, 1, '/'), (10, 3, 0, 1))
+        self.assertEqual(Game.transition(10, 2, 0, 1, 1, '4'), (10, 2, 0, -1))
+        self.assertEqual(Game.transition(10, 3, 0, 1, 1, 'x'), (10, 3, 0, -1))
+        self.assertEqual(Game.transition(1, 1, 0, 0, 2, '3'), (1, 1, 0, 0))
@@ -1,7 +1,10 @@
 from django.test import TestCase
-from bowling.models import Player, Game, Frame, Chance
+from bowling.models import Player, Game, GamePlayer, Frame, Chance, FRAMES
 from bowling.managers import GameManager
 from django.contrib.auth.models import User
+from django.db import connection
+from bowling.apps import load_reference_rows
+from unittest import mock
 
 
 class GameManagerTest(TestCase):
@@ -47,3 +50,45 @@ class GameManagerTest(TestCase):
                 found_needed_chances = False
                 break
         self.assertEqual(found_needed_chances, True)
+
+    def test_setup_cached(self):
+        with self.assertNumQueries(0):
+            GameManager.setup()
+
+    def test_frame_cache_refresh(self):
+        self.addCleanup(FRAMES.clear)
+        frame = FRAMES.get(1)
+        Frame.objects.filter(id=frame.id).delete()
+        new_frame = Frame.objects.create(number=1)
+        self.assertEqual(FRAMES.get(1), new_frame)
+
+    def test_load_reference_rows_without_tables(self):
+        self.addCleanup(FRAMES.clear)
+        FRAMES.get_rows()
+        with mock.patch.object(connection.introspection, 'table_names', return_value=[]):
+            with self.assertNumQueries(0):
+                load_reference_rows(sender=None, using='default')
+        self.assertIsNone(FRAMES._rows)
+
+    def test_new_games(self):
+        games = GameManager.new_games([
+            self.player_ids,
+            [self.player_ids[1]],
+            [self.player_ids[0], self.player_ids[0]]
+        ])
+        self.assertEqual(len(games), 3)
+        self.assertEqual(Game.objects.count(), 4)
+        self.assertEqual(games[0].current_player, self.user1.player)
+        self.assertEqual(games[1].number_of_players, 1)
+        self.assertEqual(games[2].number_of_players, 1)
+
+    def test_new_games_invalid_roster(self):
+        for rosters in [[[]], [self.player_ids, []], [[1.5]], [['x']], [[True]]]:
+            with self.assertRaises(ValueError):
+                GameManager.new_games(rosters)
+        self.assertEqual(Game.objects.count(), 1)
+
+    def test_new_games_missing_player(self):
+        with self.assertRaises(Player.DoesNotExist):
+            GameManager.new_games([self.player_ids + [0]])
+        self.assertEqual(Game.objects.count(), 1)
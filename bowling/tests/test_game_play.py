@@ -1,5 +1,8 @@
+from django.db import connection
+from django.db.models import F
 from django.test import TestCase
-from bowling.models import Player, Game, Frame, Chance
+from django.test.utils import CaptureQueriesContext
+from bowling.models import Player, Game, Frame, Chance, PlayerGame
 from bowling.managers import GameManager
 from django.contrib.auth.models import User
 
@@ -63,6 +66,15 @@ class GamePlayTest(TestCase):
         }
         self.assertEqual(self.game.get_state(), response)
 
+    def test_restart(self):
+        self.game.start()
+        self.game.bowl('7')
+        state = self.game.get_state()
+        self.assertEqual(self.game.start(), 'Game has already Started!')
+        self.assertEqual(self.game.get_state(), state)
+        version, status, cached = Game.get_cached_state(self.game.pk)
+        self.assertEqual((status, cached['frame'], cached['chance']), (1, 1, 2))
+
     def test_first_bowl(self):
         self.game.start()
         self.game.bowl('x')
@@ -149,3 +161,113 @@ class GamePlayTest(TestCase):
         }
         self.assertEqual(self.game.get_state(), response)
         self.assertEqual(self.game.is_game_over, True)
+
+    def test_invalid_mark(self):
+        self.game.start()
+        self.assertEqual(self.game.bowl('10'), 'Invalid Mark!')
+        self.assertEqual(self.game.current_chance, 1)
+
+    def test_running_score(self):
+        self.game.start()
+        for mark in ['x', '3', '4', '5', '/', '0', '0', '1', '0']:
+            self.game.bowl(mark)
+        game_player = self.game.get_gameplayer(self.game.get_player(0))
+        self.assertEqual(game_player.score, 32)
+        self.assertEqual(game_player.get_frame_scores(), [20, 11, 1])
+
+    def test_get_state_queries(self):
+        self.game.start()
+        for mark in ['x', '3', '4', '5', '/']:
+            self.game.bowl(mark)
+        game = Game.objects.get(id=self.game.id)
+        with self.assertNumQueries(1):
+            game.get_state()
+
+    def test_packed_marks(self):
+        self.game.start()
+        for mark in ['x', '3', '4', '5', '/']:
+            self.game.bowl(mark)
+        game = Game.objects.get(id=self.game.id)
+        game_player = game.get_gameplayer(game.get_player(1))
+        with self.assertNumQueries(0):
+            self.assertEqual(game_player.get_marks_list(), ['3', '4'])
+
+    def test_bowl_single_game_update(self):
+        self.game.start()
+        self.game.bowl('x')
+        with CaptureQueriesContext(connection) as queries:
+            self.game.bowl('3')
+            self.game.bowl('/')
+        updates = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "bowling_game"')
+        ]
+        self.assertEqual(len(updates), 2)
+
+    def test_bowl_many(self):
+        self.game.start()
+        player_games = self.game.bowl_many(['x', '3', '4', '5', '/', '0', '0'])
+        self.assertEqual(len(player_games), 7)
+        self.assertEqual(PlayerGame.objects.count(), 7)
+        game = Game.objects.get(id=self.game.id)
+        self.assertEqual(
+            (game.current_frame, game.current_chance, game.current_player_index),
+            (3, 1, 0)
+        )
+        self.assertEqual(
+            game.get_scores(),
+            {0: {game.get_player(0).name: 20}, 1: {game.get_player(1).name: 7}}
+        )
+
+    def test_bowl_many_rejects_batch(self):
+        self.game.start()
+        self.assertEqual(self.game.bowl_many(['x', '3', '11']), 'Invalid Mark!')
+        self.assertEqual(PlayerGame.objects.count(), 0)
+        self.assertEqual(self.game.current_player_index, 0)
+        self.assertEqual(self.game.get_gameplayer(self.user1.player).score, 0)
+
+    def test_bowl_many_full_game_queries(self):
+        self.game.start()
+        game = Game.objects.get(id=self.game.id)
+        # The finishing batch also stores the final scores, updates both
+        # players' PlayerStats rows and the day and week ScoreRollups, and
+        # inserts both sets (each in a savepoint) since they don't exist yet.
+        with self.assertNumQueries(18):
+            game.bowl_many(['x'] * 24)
+        self.assertEqual(game.is_game_over, True)
+        self.assertEqual(game.get_gameplayer(self.user1.player).score, 300)
+
+    def test_cached_state(self):
+        self.game.start()
+        for mark in ['x', '3', '4', '5', '/']:
+            self.game.bowl(mark)
+        state = self.game.get_state()
+        with self.assertNumQueries(1):
+            version, status, cached = Game.get_cached_state(self.game.id)
+        self.assertEqual(version, self.game.version)
+        self.assertEqual(cached['player'], state['player'].name)
+        self.assertEqual(cached['scores'], state['scores'])
+        self.assertEqual(
+            (cached['frame'], cached['chance']),
+            (state['frame'], state['chance'])
+        )
+
+    def test_cached_state_stale(self):
+        self.game.start()
+        self.game.bowl('x')
+        game = Game.objects.get(id=self.game.id)
+        game.current_frame = 5
+        game.save()
+        with self.assertNumQueries(2):
+            version, status, cached = Game.get_cached_state(self.game.id)
+        self.assertEqual(version, game.version)
+        self.assertEqual(cached['frame'], 5)
+
+    def test_cached_state_other_process(self):
+        # Another process bowls: nothing here is told, only the row changes.
+        self.game.start()
+        Game.get_cached_state(self.game.id)
+        Game.objects.filter(id=self.game.id).update(current_frame=5, version=F('version') + 1)
+        version, status, cached = Game.get_cached_state(self.game.id)
+        self.assertEqual(version, self.game.version + 1)
+        self.assertEqual(cached['frame'], 5)
@@ -0,0 +1,102 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from tastypie.test import ResourceTestCaseMixin
+from bowling.imports import import_players, read_rows
+from bowling.models import Player
+import io
+import json
+import tempfile
+from unittest import mock
+
+
+class ImportTest(ResourceTestCaseMixin, TestCase):
+    def setUp(self):
+        super(ImportTest, self).setUp()
+        self.user = User.objects.create_superuser('testadmin', 'test@example.com', 'testpass')
+        self.roster = [
+            'username,password,name,email',
+            'testusera,12345,testa,a@example.com',
+            'testuserb,12345,testb,',
+            'testuserc,12345,toolong,',
+            'testadmin,12345,admin,',
+            'testusera,12345,again,',
+            ',12345,nouser,',
+            'testuserd,12345,testd,',
+        ]
+
+    def assertImported(self, result):
+        self.assertEqual(result['created'], 3)
+        self.assertEqual(
+            [(error['row'], error['username']) for error in result['errors']],
+            [(3, 'testuserc'), (4, 'testadmin'), (5, 'testusera'), (6, '')]
+        )
+        user = User.objects.get(username='testusera')
+        self.assertTrue(user.check_password('12345'))
+        self.assertEqual((user.email, user.player.name), ('a@example.com', 'testa'))
+        self.assertTrue(user.api_key.key)
+        self.assertEqual(Player.objects.filter(user__username__startswith='testuser').count(), 3)
+
+    def test_import_csv(self):
+        self.assertImported(import_players(read_rows(self.roster, 'csv'), chunk_size=2, workers=1))
+
+    def test_import_json(self):
+        lines = []
+        for line in self.roster[1:]:
+            username, password, name, email = line.split(',')
+            lines.append(json.dumps({'name': name, 'user': {'username': username, 'password': password}}))
+        lines.insert(2, '{not json')
+        result = import_players(read_rows(lines, 'json'), workers=1)
+        self.assertEqual(result['created'], 3)
+        self.assertEqual(result['errors'][0], {'row': 3, 'username': None, 'error': 'Invalid JSON.'})
+
+    def test_import_pool(self):
+        result = import_players(read_rows(self.roster[:3], 'csv'), workers=2)
+        self.assertEqual(result, {'created': 2, 'errors': []})
+        self.assertTrue(User.objects.get(username='testuserb').check_password('12345'))
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as roster:
+            roster.write('\n'.join(self.roster))
+            roster.flush()
+            output = io.StringIO()
+            errors = io.StringIO()
+            call_command('import_players', roster.name, workers=1, stdout=output, stderr=errors)
+        self.assertEqual(output.getvalue().strip(), 'Created 3 players, 4 rows failed.')
+        self.assertIn('Row 4 (testadmin): Username is taken.', errors.getvalue())
+
+    def post_roster(self, roster):
+        return self.api_client.client.post(
+            '/api/v1/player/import/',
+            '\n'.join(roster),
+            content_type='text/csv',
+            HTTP_AUTHORIZATION=self.create_apikey('testadmin', self.user.api_key.key)
+        )
+
+    def test_import_endpoint(self):
+        with self.settings(BOWLING_IMPORT_WORKERS=4):
+            with mock.patch('bowling.imports.ProcessPoolExecutor') as pool:
+                resp = self.post_roster(self.roster)
+        self.assertHttpOK(resp)
+        self.assertFalse(pool.called)
+        self.assertImported(self.deserialize(resp))
+
+    def test_import_endpoint_limit(self):
+        with self.settings(BOWLING_IMPORT_REQUEST_ROWS=6):
+            resp = self.post_roster(self.roster)
+        self.assertHttpBadRequest(resp)
+        self.assertIn('import_players command', resp.content.decode('utf-8'))
+        self.assertFalse(User.objects.filter(username='testusera').exists())
+        with self.settings(BOWLING_IMPORT_REQUEST_ROWS=7):
+            self.assertImported(self.deserialize(self.post_roster(self.roster)))
+
+    def test_import_endpoint_unauthorized(self):
+        user = User.objects.create_user(username='testplayer', password='12345')
+        resp = self.api_client.client.post(
+            '/api/v1/player/import/',
+            '\n'.join(self.roster),
+            content_type='text/csv',
+            HTTP_AUTHORIZATION=self.create_apikey('testplayer', user.api_key.key)
+        )
+        self.assertHttpUnauthorized(resp)
+        self.assertFalse(User.objects.filter(username='testusera').exists())
@@ -0,0 +1,101 @@
+from django.db import connection
+from django.test import TestCase
+from bowling.models import Game, GamePlayer, PlayerGame
+from bowling.managers import GameManager
+from bowling.api.paginators import KeysetPaginator, ScorePaginator
+from django.contrib.auth.models import User
+import re
+
+
+def explain(queryset):
+    """Returns the database's query plan for queryset as str.
+
+    PostgreSQL is told to avoid sequential scans so a plan only contains one
+    when no index can serve the query. psycopg2 sends parameters inline, so
+    for SQLite they are inlined too, letting it consider partial indexes.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql, params)
+        else:
+            literals = tuple(
+                str(param) if isinstance(param, int) else "'{}'".format(param)
+                for param in params
+            )
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql.replace('%s', '{}').format(*literals))
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def is_sequential_scan(plan):
+    """Takes str plan and returns bool representing whether any table is read in full.
+
+    """
+    if 'Seq Scan' in plan:
+        return True
+    for line in plan.splitlines():
+        if re.match(r'^SCAN( TABLE)? \w+$', line.strip()):
+            return True
+    return False
+
+
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        player_ids = []
+        for x in range(4):
+            user = User.objects.create_user(
+                username='testuser{}'.format(x),
+                password='12345'
+            )
+            player_ids.append(user.player.id)
+        cls.games = []
+        for x in range(10):
+            game = GameManager.new_game(player_ids[x % 2:x % 2 + 3])
+            game.start()
+            game.bowl_many(['x', '3', '4', '5', '/', '0', '0'] * (x % 3))
+            cls.games.append(game)
+        cls.game_player = GamePlayer.objects.filter(game=cls.games[-1]).first()
+
+    def assertIndexed(self, queryset):
+        plan = explain(queryset)
+        self.assertFalse(is_sequential_scan(plan), plan)
+
+    def test_is_sequential_scan(self):
+        self.assertTrue(is_sequential_scan('Seq Scan on bowling_game'))
+        self.assertTrue(is_sequential_scan('SCAN bowling_game'))
+        self.assertTrue(is_sequential_scan('SCAN TABLE bowling_game'))
+        self.assertFalse(is_sequential_scan('SEARCH bowling_game USING INTEGER PRIMARY KEY (rowid=?)'))
+
+    def test_game_marks_plan(self):
+        self.assertIndexed(self.game_player.get_game_marks())
+
+    def test_gameplayer_lookup_plan(self):
+        self.assertIndexed(GamePlayer.objects.filter(
+            player=self.game_player.player,
+            game=self.game_player.game
+        ))
+
+    def test_roster_plan(self):
+        self.assertIndexed(GamePlayer.objects.filter(
+            game=self.games[0]
+        ).select_related('player').order_by('id'))
+
+    def test_game_version_plan(self):
+        self.assertIndexed(Game.objects.filter(pk=self.games[0].pk, version=1))
+
+    def test_active_games_plan(self):
+        self.assertIndexed(Game.objects.filter(status=1))
+
+    def test_keyset_page_plan(self):
+        objects = PlayerGame.objects.order_by('date_created', 'id')
+        cursor = KeysetPaginator.encode_cursor(objects[3])
+        self.assertIndexed(KeysetPaginator({}, objects).get_after(objects, '', cursor)[:21])
+
+    def test_leaderboard_page_plan(self):
+        objects = GamePlayer.objects.filter(final_score__isnull=False).order_by('-final_score', '-id')
+        self.assertIndexed(objects[:21])
+        cursor = ScorePaginator.encode_cursor(GamePlayer(id=self.game_player.id, final_score=150))
+        self.assertIndexed(ScorePaginator({}, objects).get_after(objects, '-', cursor)[:21])
+        self.assertIndexed(objects.filter(player=self.game_player.player)[:21])
@@ -0,0 +1,51 @@
+from django.test import SimpleTestCase
+from bowling.models import Game, NO_MARK
+from bowling.scoring import encode_marks, score_marks
+from bowling.management.commands.benchmark_scoring import random_game
+import random
+
+
+class BatchScoringTest(SimpleTestCase):
+    def setUp(self):
+        self.vectors = [
+            [],
+            ['5'],
+            ['5', '3'],
+            ['5', '3', '1'],
+            ['5', '3', '6', '/', '3', '/', '6', '0', 'x', '6', '/', '0', '/', '6'],
+            ['x', 'x', 'x', 'x', 'x', 'x', 'x', 'x', 'x', 'x', 'x', 'x'],
+            ['9', '/', '9', '/', '9', '/', '9', '/', '9', '/', '9', '/', '9', '/', '9', '/', '9', '/', '9', '/', '9'],
+            ['x', 'x', 'x', 'x', 'x', 'x', 'x', 'x', 'x', 'x', 'x']
+        ]
+
+    def test_encode_marks(self):
+        rolls = encode_marks([['x', '/', '0', '9']])
+        self.assertEqual(rolls.shape, (1, 21))
+        self.assertEqual(list(rolls[0, :5]), [11, 10, 0, 9, NO_MARK])
+
+    def test_final_scores(self):
+        final, frames = score_marks(self.vectors)
+        self.assertEqual(
+            list(final),
+            [Game.calculate_score(marks) for marks in self.vectors]
+        )
+
+    def test_frame_scores(self):
+        final, frames = score_marks(self.vectors)
+        for marks, row in zip(self.vectors, frames):
+            score_state = Game.new_score_state()
+            for mark in marks:
+                score_state = Game.score_mark(score_state, mark)
+            expected = [frame or 0 for frame in score_state['frames']]
+            self.assertEqual(list(row[:len(expected)]), expected)
+            self.assertFalse(row[len(expected):].any())
+
+    def test_random_games(self):
+        random.seed(7)
+        games = [random_game() for _ in range(500)]
+        games += [game[:random.randint(0, len(game))] for game in games]
+        final, frames = score_marks(games)
+        self.assertEqual(
+            list(final),
+            [Game.calculate_score(marks) for marks in games]
+        )
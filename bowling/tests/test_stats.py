@@ -0,0 +1,199 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from tastypie.test import ResourceTestCaseMixin
+from bowling.managers import GameManager
+from bowling.models import GamePlayer, PlayerStats, ScoreRollup
+import datetime
+import io
+
+
+class PlayerStatsTest(ResourceTestCaseMixin, TestCase):
+    def setUp(self):
+        super(PlayerStatsTest, self).setUp()
+        self.user = User.objects.create_superuser('testadmin', 'test@example.com', 'testpass')
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.user2 = User.objects.create_user(
+            username='testuserb',
+            password='12345'
+        )
+        self.player1 = self.user1.player
+        self.player2 = self.user2.player
+
+    def play(self, players, marks):
+        game = GameManager.new_game([player.id for player in players])
+        game.start()
+        game.bowl_many(marks)
+        return game
+
+    def test_tally(self):
+        counts = PlayerStats.tally(['x', '7', '/', '9', '0'] + ['0'] * 12 + ['x', 'x', 'x'], 99)
+        self.assertEqual(
+            (counts['strikes'], counts['strike_chances'], counts['spares'], counts['spare_chances']),
+            (4, 12, 1, 8)
+        )
+
+    def test_stats_recorded_on_finish(self):
+        game = self.play([self.player1, self.player2], ['x', '3', '4'] * 9)
+        self.assertFalse(PlayerStats.objects.exists())
+        for mark in ['x', 'x', 'x', '3', '/', '5']:
+            game.bowl(mark)
+        self.assertEqual(game.status, -1)
+        self.play([self.player1], ['0'] * 20)
+        stats = PlayerStats.objects.get(pk=self.player1.id)
+        self.assertEqual((stats.games, stats.high_game, stats.total_score), (2, 300, 300))
+        self.assertEqual(stats.average, 150)
+        self.assertEqual((stats.strikes, stats.strike_chances), (12, 22))
+        stats = PlayerStats.objects.get(pk=self.player2.id)
+        self.assertEqual((stats.games, stats.high_game, stats.spares, stats.spare_chances), (1, 78, 1, 10))
+
+    def test_restart_finished(self):
+        game = self.play([self.player1], ['x'] * 12)
+        self.assertEqual(game.start(), 'Game is Over!')
+        self.assertEqual(game.bowl_many(['x'] * 12), 'Game is Over!')
+        stats = PlayerStats.objects.get(pk=self.player1.id)
+        self.assertEqual((stats.games, stats.total_score), (1, 300))
+        self.assertEqual(GamePlayer.objects.get(game=game).final_score, 300)
+
+    def test_rebuild(self):
+        self.play([self.player1, self.player2], ['3', '/', '4', '5'] * 10 + ['6'])
+        self.play([self.player1], ['x'] * 12)
+        self.play([self.player2], ['x'] * 3)
+        recorded = {stats.pk: stats.as_dict() for stats in PlayerStats.objects.all()}
+        PlayerStats.objects.update(games=0)
+        output = io.StringIO()
+        call_command('rebuild_player_stats', stdout=output)
+        self.assertEqual(output.getvalue().strip(), 'Rebuilt stats of 2 players.')
+        self.assertEqual({stats.pk: stats.as_dict() for stats in PlayerStats.objects.all()}, recorded)
+        self.assertEqual(recorded[self.player1.id]['high_game'], 300)
+
+    def test_stats_endpoint(self):
+        self.play([self.player1], ['x'] * 12)
+        credentials = self.create_apikey('testadmin', self.user.api_key.key)
+        url = '/api/v1/player/{}/stats/'.format(self.player1.id)
+        self.api_client.get(url, authentication=credentials)
+        with self.assertNumQueries(1):
+            resp = self.api_client.get(url, authentication=credentials)
+        self.assertHttpOK(resp)
+        self.assertEqual(
+            self.deserialize(resp),
+            {
+                'player': self.player1.id,
+                'games': 1,
+                'average': 300,
+                'high_game': 300,
+                'strikes': 12,
+                'strike_rate': 1,
+                'spares': 0,
+                'spare_rate': 0
+            }
+        )
+        resp = self.api_client.get('/api/v1/player/{}/stats/'.format(self.player2.id), authentication=credentials)
+        self.assertEqual(self.deserialize(resp)['games'], 0)
+        self.assertHttpNotFound(self.api_client.get('/api/v1/player/0/stats/', authentication=credentials))
+
+
+class ScoreRollupTest(ResourceTestCaseMixin, TestCase):
+    def setUp(self):
+        super(ScoreRollupTest, self).setUp()
+        self.user = User.objects.create_superuser('testadmin', 'test@example.com', 'testpass')
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.user2 = User.objects.create_user(
+            username='testuserb',
+            password='12345'
+        )
+
+    def play(self, marks):
+        game = GameManager.new_game([self.user1.player.id, self.user2.player.id])
+        game.start()
+        game.bowl_many(marks)
+
+    def test_cover(self):
+        # 2018-07-09 is a Monday.
+        self.assertEqual(
+            ScoreRollup.cover(datetime.date(2018, 7, 7), datetime.date(2018, 7, 24)),
+            (
+                [
+                    datetime.date(2018, 7, 7),
+                    datetime.date(2018, 7, 8),
+                    datetime.date(2018, 7, 23),
+                    datetime.date(2018, 7, 24),
+                ],
+                (datetime.date(2018, 7, 9), datetime.date(2018, 7, 16))
+            )
+        )
+        self.assertEqual(
+            ScoreRollup.cover(datetime.date(2018, 7, 10), datetime.date(2018, 7, 21)),
+            ([datetime.date(2018, 7, 10) + datetime.timedelta(days=i) for i in range(12)], None)
+        )
+        days, weeks = ScoreRollup.cover(datetime.date(1, 1, 1), datetime.date.max)
+        self.assertEqual(len(days), 5)
+        self.assertEqual(weeks[1], datetime.date(9999, 12, 20))
+
+    def test_rollups_recorded_on_finish(self):
+        self.play(['x'] * 24)
+        self.play(['3', '4'] * 20)
+        today = timezone.localdate()
+        for period, start in ScoreRollup.buckets(timezone.now()):
+            rollup = ScoreRollup.objects.get(period=period, start=start)
+            self.assertEqual((rollup.games, rollup.total_score, rollup.high_game), (4, 740, 300))
+        summary = ScoreRollup.summarize(today, today)
+        self.assertEqual((summary.games, summary.average, summary.strikes), (4, 185, 24))
+        recorded = {(rollup.period, rollup.start): rollup.get_counts() for rollup in ScoreRollup.objects.all()}
+        ScoreRollup.objects.update(games=0)
+        output = io.StringIO()
+        call_command('rebuild_score_rollups', stdout=output)
+        self.assertEqual(output.getvalue().strip(), 'Rebuilt 2 rollups.')
+        self.assertEqual(
+            {(rollup.period, rollup.start): rollup.get_counts() for rollup in ScoreRollup.objects.all()},
+            recorded
+        )
+
+    def test_summarize(self):
+        monday = datetime.date(2018, 7, 9)
+        for period, start, score in [
+            ('day', monday - datetime.timedelta(days=1), 100),
+            ('week', monday - datetime.timedelta(days=7), 100),
+            ('day', monday, 150),
+            ('day', monday + datetime.timedelta(days=6), 200),
+            ('week', monday, 350),
+            ('day', monday + datetime.timedelta(days=7), 250),
+        ]:
+            ScoreRollup.objects.create(period=period, start=start, games=1, total_score=score, high_game=score)
+        summary = ScoreRollup.summarize(monday - datetime.timedelta(days=1), monday + datetime.timedelta(days=7))
+        self.assertEqual((summary.games, summary.total_score, summary.high_game), (3, 700, 350))
+        summary = ScoreRollup.summarize(monday, monday + datetime.timedelta(days=5))
+        self.assertEqual((summary.games, summary.total_score), (1, 150))
+        with self.assertNumQueries(1):
+            summary = ScoreRollup.summarize(datetime.date(2010, 1, 1), datetime.date(2030, 1, 1))
+        self.assertEqual((summary.games, summary.total_score), (2, 450))
+
+    def test_summary_endpoint(self):
+        self.play(['x'] * 24)
+        credentials = self.create_apikey('testadmin', self.user.api_key.key)
+        resp = self.api_client.get('/api/v1/rollup/summary/', authentication=credentials)
+        self.assertHttpOK(resp)
+        data = self.deserialize(resp)
+        self.assertEqual((data['games'], data['high_game'], data['strike_rate']), (2, 300, 1))
+        self.assertEqual(data['start'], timezone.localdate().isoformat())
+        self.assertHttpBadRequest(
+            self.api_client.get('/api/v1/rollup/summary/?start=yesterday', authentication=credentials)
+        )
+        self.assertHttpBadRequest(
+            self.api_client.get('/api/v1/rollup/summary/?start=2018-02-30', authentication=credentials)
+        )
+        resp = self.api_client.get('/api/v1/rollup/summary/?start=0001-01-01&end=9999-12-31', authentication=credentials)
+        self.assertHttpOK(resp)
+        self.assertEqual(self.deserialize(resp)['games'], 2)
+        self.assertHttpUnauthorized(
+            self.api_client.get('/api/v1/rollup/summary/', authentication=self.create_apikey(
+                'testusera', self.user1.api_key.key
+            ))
+        )
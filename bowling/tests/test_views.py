@@ -0,0 +1,198 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from tastypie.test import ResourceTestCaseMixin
+from django.contrib.auth.models import User
+from bowling.models import PlayerGame
+from bowling.managers import GameManager
+from bowling.events import EVENTS
+import json
+
+
+class LaneViewTest(ResourceTestCaseMixin, TestCase):
+    def setUp(self):
+        super(LaneViewTest, self).setUp()
+        self.username = 'testadmin'
+        self.password = 'testpass'
+        self.user = User.objects.create_superuser(self.username, 'test@example.com', self.password)
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.user2 = User.objects.create_user(
+            username='testuserb',
+            password='12345'
+        )
+        self.game = GameManager.new_game([
+            self.user1.player.id,
+            self.user2.player.id
+        ])
+        self.game.start()
+
+    def get_credentials(self):
+        return self.create_apikey(self.username, self.user.api_key.key)
+
+    def test_get_state_matches_api(self):
+        self.game.bowl('7')
+        fast = self.api_client.get(
+            '/bowling/game/{}/get_state/'.format(self.game.id),
+            authentication=self.get_credentials()
+        )
+        api = self.api_client.get(
+            '/api/v1/game/{}/get_state/'.format(self.game.id),
+            authentication=self.get_credentials()
+        )
+        self.assertValidJSONResponse(fast)
+        self.assertEqual(fast.content, api.content)
+
+    def test_get_state_not_modified(self):
+        url = '/bowling/game/{}/get_state/'.format(self.game.id)
+        resp = self.api_client.get(url, authentication=self.get_credentials())
+        etag = resp['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.api_client.get(
+                url,
+                authentication=self.get_credentials(),
+                HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b'')
+        game_queries = [q['sql'] for q in queries if 'bowling_' in q['sql']]
+        self.assertEqual(len(game_queries), 1)
+        self.game.bowl('7')
+        resp = self.api_client.get(
+            url,
+            authentication=self.get_credentials(),
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertHttpOK(resp)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_bowl(self):
+        resp = self.api_client.get(
+            '/bowling/game/{}/bowl/?mark=x'.format(self.game.id),
+            authentication=self.get_credentials()
+        )
+        self.assertHttpOK(resp)
+        self.assertEqual(PlayerGame.objects.get().mark, 'x')
+
+    def test_unauthenticated(self):
+        self.assertHttpUnauthorized(
+            self.api_client.get('/bowling/game/{}/get_state/'.format(self.game.id))
+        )
+
+    def test_unauthorized(self):
+        resp = self.api_client.get(
+            '/bowling/game/{}/get_state/'.format(self.game.id),
+            authentication=self.create_apikey('testusera', self.user1.api_key.key)
+        )
+        self.assertHttpUnauthorized(resp)
+
+    def test_missing_game(self):
+        self.assertHttpNotFound(
+            self.api_client.get(
+                '/bowling/game/0/get_state/',
+                authentication=self.get_credentials()
+            )
+        )
+
+
+class LaneEventsTest(ResourceTestCaseMixin, TestCase):
+    def setUp(self):
+        super(LaneEventsTest, self).setUp()
+        EVENTS.clear()
+        self.user = User.objects.create_superuser('testadmin', 'test@example.com', 'testpass')
+        self.user1 = User.objects.create_user(
+            username='testusera',
+            password='12345'
+        )
+        self.user1.player.name = 'testa'
+        self.user1.player.save()
+        self.game = GameManager.new_game([self.user1.player.id])
+        self.url = '/bowling/game/{}/events/'.format(self.game.id)
+
+    def get_credentials(self):
+        return self.create_apikey('testadmin', self.user.api_key.key)
+
+    def run_commit_hooks(self):
+        hooks = connection.run_on_commit
+        connection.run_on_commit = []
+        for savepoint_ids, hook in hooks:
+            hook()
+
+    def read_event(self, stream):
+        lines = dict(line.split(': ', 1) for line in next(stream).decode('utf-8').strip().split('\n'))
+        return int(lines['id']), lines['event'], json.loads(lines['data'])
+
+    def test_events(self):
+        self.game.start()
+        self.run_commit_hooks()
+        resp = self.api_client.get(self.url, authentication=self.get_credentials())
+        self.assertEqual(resp['Content-Type'], 'text/event-stream')
+        stream = iter(resp.streaming_content)
+        self.assertTrue(next(stream).startswith(b'retry: '))
+        event_id, name, data = self.read_event(stream)
+        self.assertEqual((event_id, name), (self.game.version, 'state'))
+        self.assertEqual(data['state']['player'], 'testa')
+        self.game.bowl('7')
+        with self.assertNumQueries(0):
+            self.run_commit_hooks()
+            event_id, name, data = self.read_event(stream)
+        self.assertEqual((event_id, name), (self.game.version, 'bowl'))
+        self.assertEqual(data['rolls'], [{'player': 'testa', 'frame': 1, 'chance': 1, 'mark': '7'}])
+        self.assertEqual((data['state']['chance'], data['scores']), (2, {'0': {'testa': 0}}))
+        resp.close()
+
+    def test_events_out_of_order(self):
+        self.game.start()
+        self.run_commit_hooks()
+        resp = self.api_client.get(self.url, authentication=self.get_credentials())
+        stream = iter(resp.streaming_content)
+        next(stream)
+        self.read_event(stream)
+        self.game.bowl('7')
+        self.game.bowl('2')
+        # The second roll's transaction commits first.
+        connection.run_on_commit.reverse()
+        self.run_commit_hooks()
+        event_id, name, data = self.read_event(stream)
+        self.assertEqual((event_id, name), (self.game.version, 'state'))
+        self.assertEqual((data['state']['frame'], data['state']['chance']), (2, 1))
+        self.game.bowl('x')
+        self.run_commit_hooks()
+        event_id, name, data = self.read_event(stream)
+        self.assertEqual((event_id, name), (self.game.version, 'bowl'))
+        self.assertEqual(data['rolls'][0]['mark'], 'x')
+        resp.close()
+
+    def test_events_replay(self):
+        self.game.start()
+        self.run_commit_hooks()
+        started = self.game.version
+        self.game.bowl('7')
+        self.game.bowl_many(['2', 'x'])
+        self.run_commit_hooks()
+        resp = self.api_client.get(
+            self.url,
+            authentication=self.get_credentials(),
+            HTTP_LAST_EVENT_ID=str(started)
+        )
+        stream = iter(resp.streaming_content)
+        next(stream)
+        rolls = []
+        for x in range(2):
+            event_id, name, data = self.read_event(stream)
+            self.assertEqual(name, 'bowl')
+            rolls += [roll['mark'] for roll in data['rolls']]
+        self.assertEqual(rolls, ['7', '2', 'x'])
+        self.assertEqual(event_id, self.game.version)
+        resp.close()
+
+    def test_events_game_over(self):
+        self.game.start()
+        self.game.bowl_many(['x'] * 12)
+        self.run_commit_hooks()
+        resp = self.api_client.get(self.url, authentication=self.get_credentials())
+        chunks = list(resp.streaming_content)
+        self.assertEqual(len(chunks), 2)
+        self.assertIn(b'"status": -1', chunks[1])
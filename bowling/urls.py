@@ -4,4 +4,7 @@ from . import views
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('game/<int:pk>/bowl/', views.bowl, name='lane_bowl'),
+    path('game/<int:pk>/get_state/', views.get_state, name='lane_get_state'),
+    path('game/<int:pk>/events/', views.events, name='lane_events'),
 ]
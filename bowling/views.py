@@ -1,7 +1,191 @@
 from django.shortcuts import render
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from tastypie.authentication import MultiAuthentication, SessionAuthentication, BasicAuthentication
+from bowling.api.authentication import CachedApiKeyAuthentication
+from tastypie import http
+from bowling.models import Game
+from bowling.events import EVENTS, format_event, version_gap
+from functools import partial, wraps
+import json
+import queue
+
+
+# Same authentication as GameResource, built once per process.
+LANE_AUTHENTICATION = MultiAuthentication(
+    CachedApiKeyAuthentication(),
+    SessionAuthentication(),
+    BasicAuthentication()
+)
+LANE_PERMISSION = 'bowling.change_game'
+LANE_ENCODER = json.JSONEncoder(sort_keys=True, ensure_ascii=False, default=str)
+LANE_CONTENT_TYPE = 'application/json; charset=utf-8'
 
 
 def index(request):
     context = {
     }
     return render(request, "bowling/index.html", context)
+
+
+def lane_response(data, response_class=HttpResponse):
+    """Takes dict data and returns it as a JSON response shaped like the API's.
+
+    """
+    return response_class(
+        content=LANE_ENCODER.encode(data),
+        content_type=LANE_CONTENT_TYPE
+    )
+
+
+def lane_unauthorized(request):
+    """Takes request and returns an error response if it fails GameResource's authentication or authorization, else None.
+
+    """
+    auth_result = LANE_AUTHENTICATION.is_authenticated(request)
+    if isinstance(auth_result, HttpResponse):
+        return auth_result
+    if auth_result is not True:
+        return http.HttpUnauthorized()
+    if not request.user.has_perm(LANE_PERMISSION):
+        return http.HttpUnauthorized()
+    return None
+
+
+def state_not_modified(request, pk):
+    """Takes request and game pk and returns a 304 response if the client already has the current state, else None.
+
+    Only the game's version is read, so nothing is scored or serialized.
+    """
+    if 'HTTP_IF_NONE_MATCH' not in request.META:
+        return None
+    version = Game.get_version(pk)
+    if version is None:
+        return None
+    return get_conditional_response(request, etag=Game.state_etag(pk, version))
+
+
+def lane_view(view=None, conditional=False):
+    """Decorates view(request, pk) with GameResource's authentication and authorization.
+
+    The decorated view takes the game pk from the URL and returns the dict
+    view returns as JSON, or a 404 if view raises Game.DoesNotExist.
+    Conditional views return a tuple (game version, dict); they answer
+    If-None-Match with 304 and tag their responses with the state ETag.
+    """
+    if view is None:
+        return partial(lane_view, conditional=conditional)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapped(request, pk):
+        unauthorized = lane_unauthorized(request)
+        if unauthorized is not None:
+            return unauthorized
+        if conditional:
+            not_modified = state_not_modified(request, pk)
+            if not_modified is not None:
+                return not_modified
+        try:
+            data = view(request, pk)
+        except Game.DoesNotExist:
+            return lane_response({'error': 'Game not found.'}, http.HttpNotFound)
+        if not conditional:
+            return lane_response(data)
+        version, data = data
+        response = lane_response(data)
+        response['ETag'] = Game.state_etag(pk, version)
+        return response
+    return wrapped
+
+
+@lane_view
+def bowl(request, pk):
+    game = Game.get_with_roster(pk)
+    if request.method == 'POST':
+        mark = request.POST.get('mark', '')
+    else:
+        mark = request.GET.get('mark', '')
+    return {"Bowl Entered": game.bowl(mark)}
+
+
+@lane_view(conditional=True)
+def get_state(request, pk):
+    version, status, state = Game.get_cached_state(pk)
+    return version, {"State": state}
+
+
+def requested_event_id(request):
+    """Takes request and returns int id of the last event the client has seen, or None.
+
+    Read from the Last-Event-ID header, or a last_event_id parameter for
+    clients that can't set headers.
+    """
+    last_event_id = request.META.get('HTTP_LAST_EVENT_ID', request.GET.get('last_event_id'))
+    try:
+        return int(last_event_id) if last_event_id else None
+    except ValueError:
+        return None
+
+
+def state_event(pk):
+    """Takes game pk and returns its current state as an event tuple.
+
+    """
+    version, status, state = Game.get_cached_state(pk)
+    return (version, 'state', {'state': state, 'status': status})
+
+
+def event_stream(pk, last_event_id):
+    """Yields str Server-Sent Events for game pk until it is over, starting after last_event_id.
+
+    Missed events still held by EVENTS are replayed; otherwise the stream
+    starts with a state event holding the full state. A comment is sent
+    every BOWLING_EVENTS_HEARTBEAT seconds without events. An event
+    arriving past a version gap is replaced by a state event, so rolls
+    arriving out of order are never skipped.
+    """
+    heartbeat = getattr(settings, 'BOWLING_EVENTS_HEARTBEAT', 15)
+    subscriber, missed = EVENTS.subscribe(pk, last_event_id)
+    try:
+        yield 'retry: {}\n\n'.format(heartbeat * 1000)
+        if missed is None:
+            missed = [state_event(pk)]
+        last_sent = last_event_id
+        while True:
+            for event in missed:
+                if last_sent is not None and event[0] <= last_sent:
+                    continue
+                if version_gap(event, last_sent):
+                    event = state_event(pk)
+                yield format_event(event)
+                last_sent = event[0]
+                if event[2]['status'] == -1:
+                    return
+            try:
+                missed = [subscriber.get(timeout=heartbeat)]
+            except queue.Empty:
+                missed = []
+                yield ': heartbeat\n\n'
+    finally:
+        EVENTS.unsubscribe(pk, subscriber)
+
+
+@csrf_exempt
+def events(request, pk):
+    unauthorized = lane_unauthorized(request)
+    if unauthorized is not None:
+        return unauthorized
+    try:
+        Game.get_cached_state(pk)
+    except Game.DoesNotExist:
+        return lane_response({'error': 'Game not found.'}, http.HttpNotFound)
+    response = StreamingHttpResponse(
+        event_stream(pk, requested_event_id(request)),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
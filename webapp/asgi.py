@@ -0,0 +1,18 @@
+"""
+ASGI config for webapp project.
+
+It exposes the ASGI application as a module-level variable named
+``application``. The lane routes (bowl, get_state and events) are served
+by bowling.asgi; every other request runs the WSGI application in a thread.
+
+Run it with an ASGI server, e.g. ``uvicorn webapp.asgi:application``.
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+
+# Importing the WSGI application sets DJANGO_SETTINGS_MODULE and sets up
+# Django, which bowling.asgi needs.
+from webapp.wsgi import application as wsgi_application
+from bowling.asgi import LaneApplication
+
+application = LaneApplication(WsgiToAsgi(wsgi_application))
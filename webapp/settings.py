@@ -107,6 +107,23 @@ DATABASES = {
 
 DATABASES['default'].update(db_from_env)
 
+# Cache
+# https://docs.djangoproject.com/en/2.0/topics/cache/
+# game_state entries are checked against the game version in the database,
+# so every process may keep its own. A shared backend (e.g. memcached) lets
+# processes reuse each other's entries.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'game_state': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bowling-game-state',
+        'TIMEOUT': 300,
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
@@ -141,3 +158,45 @@ USE_I18N = True
 USE_L10N = True
 
 USE_TZ = True
+
+# Bowling
+# Rolls are read from GamePlayer.marks; PlayerGame rows are an optional audit log.
+
+BOWLING_RECORD_ROLLS = True
+
+# Cache alias holding each Game's roster, state and scores (see GameStateCache).
+
+BOWLING_STATE_CACHE = 'game_state'
+
+# Upper bound on the bytes of rendered finished-game responses kept per process.
+
+BOWLING_FINISHED_CACHE_BYTES = 32 * 1024 * 1024
+
+# Seconds an authenticated API key (with its user's permissions) is reused per process.
+
+BOWLING_AUTH_CACHE_TTL = 60
+
+# Live game events (see bowling.events): seconds between heartbeats, events kept
+# per game for reconnecting clients and games whose events are kept.
+
+BOWLING_EVENTS_HEARTBEAT = 15
+BOWLING_EVENTS_BACKLOG = 64
+BOWLING_EVENTS_GAMES = 1000
+
+# Threads (and so database connections) running lane views under webapp.asgi.
+
+BOWLING_ASGI_THREADS = 8
+
+# Processes hashing passwords in the import_players command (None for the CPU count).
+
+BOWLING_IMPORT_WORKERS = None
+
+# Most rows player/import takes in one request. Hashing a password takes about
+# 0.2s, so 100 rows finish well inside Heroku's 30 second request timeout;
+# larger rosters go through the import_players command.
+
+BOWLING_IMPORT_REQUEST_ROWS = 100
+
+# Processes replaying games in the rescore_games audit (None for the CPU count).
+
+BOWLING_AUDIT_WORKERS = None
@@ -16,7 +16,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 from tastypie.api import Api
-from bowling.api.resources import PlayerResource, FrameResource, ChanceResource, GameResource, PlayerGameResource, GamePlayerResource, GameManagerResource, UserResource
+from bowling.api.resources import PlayerResource, FrameResource, ChanceResource, GameResource, PlayerGameResource, GamePlayerResource, GameManagerResource, UserResource, LeaderboardResource, ScoreRollupResource
 
 
 v1_api = Api(api_name='v1')
@@ -28,6 +28,8 @@ v1_api.register(PlayerGameResource())
 v1_api.register(GamePlayerResource())
 v1_api.register(GameManagerResource())
 v1_api.register(UserResource())
+v1_api.register(LeaderboardResource())
+v1_api.register(ScoreRollupResource())
 
 urlpatterns = [
     path('bowling/', include('bowling.urls')),